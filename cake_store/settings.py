@@ -43,12 +43,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'rose_cakes.timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'rose_cakes.cart_store.CartMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -56,7 +58,9 @@ ROOT_URLCONF = 'cake_store.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timed per request when REQUEST_TIMING is on
+        'BACKEND': 'rose_cakes.timing.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,13 +80,70 @@ WSGI_APPLICATION = 'cake_store.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Applied to every new SQLite connection: WAL lets readers and the writer work
+# side by side, and busy_timeout makes a blocked connection wait for the lock
+# instead of failing with "database is locked".
+SQLITE_INIT_COMMAND = ';'.join([
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA mmap_size=134217728',
+    'PRAGMA cache_size=-20000',
+])
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+            # Take the write lock at BEGIN: a transaction that read first could
+            # otherwise not upgrade its lock and would fail without waiting
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Same file for the read-only storefront pages (rose_cakes.routers)
+    'readonly': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND + ';PRAGMA query_only=ON',
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['rose_cakes.routers.ReadOnlyRouter']
+READ_ONLY_DATABASE = 'readonly'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Swap for a shared backend (Redis/Memcached) when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rose-cakes',
+        # Room for a cached card per cake plus the card version keys
+        'OPTIONS': {'MAX_ENTRIES': 5000},
     }
 }
 
+# Where carts live: SignedCookieCartStore, or CacheCartStore for the shared cache
+CART_STORE = 'rose_cakes.cart_store.SignedCookieCartStore'
+
+# Seconds each process keeps its own copy of SiteSettings before re-checking the cache
+SITE_SETTINGS_LOCAL_TTL = 30
+
+# Server-Timing headers on every response, and a log line for requests slower than SLOW_REQUEST_MS
+REQUEST_TIMING = DEBUG
+SLOW_REQUEST_MS = 500
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -1,6 +1,51 @@
+import time
+from django.conf import settings
 from django.contrib import admin
-from .models import Cake, Order, OrderItem, Category, Coupon, SpecialOffer, SiteSettings
-from .notifications import notify_user_order_status
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import Http404
+from django.urls import path
+from django.utils import timezone
+from .models import Cake, Order, OrderItem, Category, Coupon, SpecialOffer, SiteSettings, OutboxMessage
+from .order_export import EXPORT_FORMATS, export_response
+from .orders import bulk_transition_status
+from .outbox import send_now
+from .pagination import EstimatedCountPaginator
+
+
+class UserInputFilter(admin.SimpleListFilter):
+    """Filter by a typed username or email instead of listing every user in the sidebar."""
+    title = 'user'
+    parameter_name = 'user'
+    template = 'admin/rose_cakes/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if value:
+            users = User.objects.filter(Q(username=value) | Q(email__iexact=value)).values('pk')
+            return queryset.filter(user__in=users)
+        return queryset
+
+    def choices(self, changelist):
+        # One entry carrying the other active parameters for the form's hidden inputs
+        yield {
+            'query_parts': [(k, v) for k, v in changelist.params.items() if k != self.parameter_name],
+            'value': self.value() or '',
+        }
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables too big to count on every page view."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -10,6 +55,7 @@ class CategoryAdmin(admin.ModelAdmin):
 @admin.register(Cake)
 class CakeAdmin(admin.ModelAdmin):
     list_display = ('name', 'price', 'featured', 'category', 'created_at')
+    list_select_related = ('category',)
     list_filter = ('featured', 'category', 'created_at')
     search_fields = ('name', 'description')
 
@@ -27,35 +73,44 @@ class CouponAdmin(admin.ModelAdmin):
     search_fields = ('code',)
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'customer_name', 'customer_email', 'total_amount', 'status', 'user', 'created_at')
-    list_filter = ('status', 'created_at', 'user')
+class OrderAdmin(LargeTableAdmin):
+    list_display = ('id', 'customer_name', 'customer_email', 'item_count', 'items_total', 'total_amount', 'status', 'user', 'created_at')
+    list_filter = ('status', 'created_at', UserInputFilter)
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
     search_fields = ('customer_name', 'customer_email', 'tracking_number')
-    readonly_fields = ('tracking_number', 'created_at', 'updated_at')
+    readonly_fields = ('tracking_number', 'coupon_discount', 'line_snapshot', 'item_count', 'items_total', 'created_at', 'updated_at')
     date_hierarchy = 'created_at'
     ordering = ('-created_at',)
-    actions = ('mark_confirmed', 'mark_preparing', 'mark_ready_for_pickup', 'mark_out_for_delivery', 'mark_picked_up', 'mark_cancelled')
+    actions = ('mark_confirmed', 'mark_preparing', 'mark_ready_for_pickup', 'mark_out_for_delivery', 'mark_picked_up', 'mark_cancelled',
+               'export_csv', 'export_jsonl')
+    # Adds the export links, which carry the current filters
+    change_list_template = 'admin/rose_cakes/order/change_list.html'
 
     class OrderItemInline(admin.TabularInline):
         model = OrderItem
         extra = 0
         fields = ('cake', 'quantity', 'price')
         readonly_fields = ()
+        # A plain select would load the whole menu once per item row
+        autocomplete_fields = ('cake',)
 
     inlines = [OrderItemInline]
 
     def _bulk_update_status(self, request, queryset, new_status, label):
-        updated = 0
-        for order in queryset:
-            if order.status != new_status:
-                order.status = new_status
-                order.save(update_fields=['status', 'updated_at'])
-                try:
-                    notify_user_order_status(order)
-                except Exception:
-                    pass
-                updated += 1
-        self.message_user(request, f"{updated} order(s) marked as {label}.")
+        transition = bulk_transition_status(queryset, new_status)
+        summary = f"{transition.changed} order(s) marked as {label}. Update {transition.update_seconds * 1000:.0f} ms, queue {transition.queue_seconds * 1000:.0f} ms."
+        if transition.queued and getattr(settings, 'ORDER_STATUS_SEND_INLINE', True):
+            started = time.perf_counter()
+            sent, retrying, failed = send_now(transition.queued, getattr(settings, 'NOTIFICATION_WORKERS', 4))
+            elapsed = time.perf_counter() - started
+            summary += f" {sent} of {len(transition.queued)} notification(s) sent in {elapsed * 1000:.0f} ms"
+            if retrying or failed:
+                summary += f"; {retrying + failed} left in the outbox"
+            summary += "."
+        else:
+            summary += f" {len(transition.queued)} notification(s) queued."
+        self.message_user(request, summary)
 
     def mark_confirmed(self, request, queryset):
         self._bulk_update_status(request, queryset, 'confirmed', 'confirmed')
@@ -81,10 +136,35 @@ class OrderAdmin(admin.ModelAdmin):
         self._bulk_update_status(request, queryset, 'cancelled', 'Cancelled')
     mark_cancelled.short_description = 'Mark selected orders as Cancelled'
 
+    def export_csv(self, request, queryset):
+        return export_response(queryset, 'csv')
+    export_csv.short_description = 'Export selected orders as CSV'
+
+    def export_jsonl(self, request, queryset):
+        return export_response(queryset, 'jsonl')
+    export_jsonl.short_description = 'Export selected orders as JSON Lines'
+
+    def get_urls(self):
+        return [
+            path('export/<str:format>/', self.admin_site.admin_view(self.export_view), name='rose_cakes_order_export'),
+        ] + super().get_urls()
+
+    def export_view(self, request, format):
+        """Stream every order the changelist shows for the same filters, search and date drill-down."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        if format not in EXPORT_FORMATS:
+            raise Http404
+        changelist = self.get_changelist_instance(request)
+        return export_response(changelist.queryset, format)
+
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(LargeTableAdmin):
     list_display = ('order', 'cake', 'quantity', 'price')
     list_filter = ('order__status',)
+    list_select_related = ('order', 'cake')
+    raw_id_fields = ('order',)
+    autocomplete_fields = ('cake',)
 
 @admin.register(SiteSettings)
 class SiteSettingsAdmin(admin.ModelAdmin):
@@ -114,3 +194,21 @@ class SiteSettingsAdmin(admin.ModelAdmin):
         if SiteSettings.objects.exists():
             return False
         return super().has_add_permission(request)
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(LargeTableAdmin):
+    list_display = ('id', 'channel', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'channel')
+    search_fields = ('recipient', 'subject')
+    readonly_fields = ('attempts', 'last_error', 'claimed_by', 'claimed_at', 'sent_at', 'created_at')
+    raw_id_fields = ('order',)
+    ordering = ('-created_at',)
+    actions = ('retry_now',)
+
+    def retry_now(self, request, queryset):
+        # Rows a worker is sending right now stay claimed, or they could go out twice
+        count = queryset.filter(status__in=('pending', 'failed')).update(
+            status='pending', next_attempt_at=timezone.now(), claimed_by='',
+        )
+        self.message_user(request, f"{count} notification(s) queued for another attempt.")
+    retry_now.short_description = 'Retry selected notifications now'
@@ -5,3 +5,6 @@ class RoseCakesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rose_cakes'
     verbose_name = 'Rose Cakes'
+
+    def ready(self):
+        from . import signals, timing  # noqa: F401
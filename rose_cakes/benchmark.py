@@ -0,0 +1,319 @@
+"""Seeded data and a latency/query benchmark for every storefront URL.
+
+``seed`` fills the database with a reproducible catalog, customers and order
+history using bulk inserts. ``run_cases`` drives each URL in rose_cakes.urls
+through the test client and reports p50/p95/p99 latency and queries per
+request; ``compare`` checks a run against a saved JSON baseline.
+"""
+import math
+import random
+import time
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from .caching import bump_catalog_version, invalidate_site_settings
+from .cart_store import SignedCookieCartStore, cookie_name
+from .models import Cake, Category, Coupon, Order, OrderItem, SpecialOffer
+from .rollups import rebuild as rebuild_rollups
+from .suggestions import invalidate_suggestion_index
+from .timing import RequestTiming
+
+FLAVOURS = (
+    'Chocolate', 'Vanilla', 'Red Velvet', 'Black Forest', 'Pineapple', 'Butterscotch', 'Plum', 'Truffle',
+    'Mango', 'Strawberry', 'Coffee', 'Lemon', 'Blueberry', 'Caramel', 'Rasmalai', 'Pistachio',
+)
+STYLES = ('Delight', 'Gateau', 'Cheesecake', 'Mousse Cake', 'Sponge', 'Layer Cake', 'Dream', 'Swirl')
+CATEGORY_KINDS = ('Cream', 'Fruit', 'Eggless', 'Designer', 'Birthday', 'Wedding', 'Cup', 'Jar', 'Dry', 'Premium')
+# Status mix of the seeded order history
+STATUS_WEIGHTS = (
+    ('pending', 5), ('confirmed', 5), ('processing', 3), ('ready_for_pickup', 2),
+    ('out_for_delivery', 2), ('picked_up', 80), ('cancelled', 3),
+)
+BENCHMARK_PASSWORD = 'benchmark'
+
+
+@dataclass
+class SeedSizes:
+    categories: int = 20
+    cakes: int = 2000
+    coupons: int = 50
+    offers: int = 10
+    users: int = 500
+    orders: int = 20000
+    days: int = 365
+
+
+def seed(sizes: SeedSizes, random_seed=0, batch_size=2000, progress=None) -> dict:
+    """Bulk insert a reproducible data set of ``sizes`` and return how many rows of each were written.
+
+    Bulk inserts skip signals, so the sales rollups are rebuilt and the
+    catalog caches invalidated at the end.
+    """
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    report = progress or (lambda message: None)
+
+    categories = Category.objects.bulk_create([
+        Category(name=f'{CATEGORY_KINDS[i % len(CATEGORY_KINDS)]} Cakes {i + 1}',
+                 description=f'Seeded category {i + 1}')
+        for i in range(sizes.categories)
+    ], batch_size=batch_size)
+    report(f"{len(categories)} categories")
+
+    cakes = []
+    for start in range(0, sizes.cakes, batch_size):
+        cakes += Cake.objects.bulk_create([
+            Cake(
+                name=f'{rng.choice(FLAVOURS)} {rng.choice(STYLES)} {i + 1}',
+                description=f'A {rng.choice(FLAVOURS).lower()} and {rng.choice(FLAVOURS).lower()} cake, baked to order.',
+                price=Decimal(rng.randrange(300, 3000, 50)),
+                weight=Decimal(rng.choice(('0.5', '1.0', '1.5', '2.0'))),
+                featured=rng.random() < 0.05,
+                # A few cakes stay uncategorized, as on the live menu
+                category=rng.choice(categories) if categories and rng.random() < 0.9 else None,
+            )
+            for i in range(start, min(start + batch_size, sizes.cakes))
+        ])
+    report(f"{len(cakes)} cakes")
+
+    coupons = Coupon.objects.bulk_create([
+        Coupon(code=f'BENCH{i + 1:03d}', discount_percentage=Decimal(rng.choice((5, 10, 15, 20))),
+               valid_from=now - timedelta(days=sizes.days), valid_until=now + timedelta(days=30),
+               usage_limit=10 ** 6)
+        for i in range(sizes.coupons)
+    ])
+    SpecialOffer.objects.bulk_create([
+        SpecialOffer(title=f'Offer {i + 1}', description='Seeded offer',
+                     discount_percentage=Decimal(rng.choice((0, 5, 10))), discount_amount=Decimal(rng.choice((0, 100))),
+                     minimum_order_value=Decimal(rng.choice((0, 500, 1000, 2000))), active=rng.random() < 0.8,
+                     valid_from=now - timedelta(days=rng.randrange(0, 30)), valid_until=now + timedelta(days=rng.randrange(1, 30)))
+        for i in range(sizes.offers)
+    ])
+    password = make_password(BENCHMARK_PASSWORD)
+    users = User.objects.bulk_create([
+        User(username=f'bench{i + 1}', email=f'bench{i + 1}@example.com', password=password)
+        for i in range(sizes.users)
+    ], batch_size=batch_size)
+    report(f"{len(coupons)} coupons, {sizes.offers} offers, {len(users)} users")
+
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    written = 0
+    for start in range(0, sizes.orders if cakes else 0, batch_size):
+        orders, lines, placed = [], [], []
+        for _ in range(start, min(start + batch_size, sizes.orders)):
+            chosen = rng.sample(cakes, min(len(cakes), rng.randint(1, 4)))
+            snapshot = [
+                {'cake_id': cake.id, 'name': cake.name, 'weight': str(cake.weight), 'unit_price': str(cake.price),
+                 'quantity': quantity, 'subtotal': str(cake.price * quantity), 'image': ''}
+                for cake, quantity in ((cake, rng.randint(1, 3)) for cake in chosen)
+            ]
+            items_total = sum((Decimal(line['subtotal']) for line in snapshot), Decimal('0'))
+            coupon = rng.choice(coupons) if coupons and rng.random() < 0.1 else None
+            coupon_discount = (items_total * coupon.discount_percentage / 100).quantize(Decimal('0.01')) if coupon else Decimal('0')
+            user = rng.choice(users) if users and rng.random() < 0.6 else None
+            created_at = now - timedelta(seconds=rng.randrange(sizes.days * 86400))
+            orders.append(Order(
+                customer_name=user.username if user else f'Walk-in {rng.randrange(10 ** 6)}',
+                customer_email=user.email if user else 'walkin@example.com',
+                pickup_date=timezone.localdate(created_at) + timedelta(days=rng.randint(0, 7)),
+                total_amount=items_total - coupon_discount,
+                status=rng.choices(statuses, weights)[0],
+                user=user, coupon=coupon,
+                discount_amount=coupon_discount, coupon_discount=coupon_discount,
+                line_snapshot=snapshot, item_count=sum(line['quantity'] for line in snapshot), items_total=items_total,
+            ))
+            lines.append(snapshot)
+            placed.append(created_at)
+        with transaction.atomic():
+            Order.objects.bulk_create(orders)
+            # auto_now_add stamps every row with now on insert; spread the history back out
+            for order, created_at in zip(orders, placed):
+                order.created_at = created_at
+            Order.objects.bulk_update(orders, ['created_at'], batch_size=500)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, cake_id=line['cake_id'], quantity=line['quantity'], price=Decimal(line['unit_price']))
+                for order, snapshot in zip(orders, lines)
+                for line in snapshot
+            ])
+        written += len(orders)
+        report(f"{written} orders")
+
+    rebuild_rollups()
+    invalidate_suggestion_index()
+    invalidate_site_settings()
+    bump_catalog_version()
+    return {
+        'categories': len(categories), 'cakes': len(cakes), 'coupons': len(coupons),
+        'offers': sizes.offers, 'users': len(users), 'orders': written,
+    }
+
+
+@dataclass
+class BenchmarkCase:
+    """One URL to time. ``login`` and ``cart`` are set up before each request, outside the timing."""
+    name: str
+    url: str
+    method: str = 'get'
+    data: dict = None
+    headers: dict = field(default_factory=dict)
+    login: bool = False
+    cart: bool = False
+
+
+def default_cases() -> list:
+    """A case for every URL name in rose_cakes.urls, using seeded rows for the arguments."""
+    cake = Cake.objects.filter(category__isnull=False).order_by('id').first() or Cake.objects.order_by('id').first()
+    order = Order.objects.order_by('-id').first()
+    coupon = Coupon.objects.order_by('id').first()
+    word = cake.name.split()[0] if cake else 'cake'
+    xhr = {'X-Requested-With': 'XMLHttpRequest'}
+    cake_id = cake.id if cake else 0
+    return [
+        BenchmarkCase('homepage', reverse('homepage')),
+        BenchmarkCase('catalog', reverse('catalog')),
+        BenchmarkCase('catalog_more', reverse('catalog_more')),
+        BenchmarkCase('cake_detail', reverse('cake_detail', args=[cake_id])),
+        BenchmarkCase('add_to_cart', reverse('add_to_cart', args=[cake_id]), method='post', headers=xhr),
+        BenchmarkCase('buy_now', reverse('buy_now', args=[cake_id])),
+        BenchmarkCase('remove_from_cart', reverse('remove_from_cart', args=[cake_id]), cart=True),
+        BenchmarkCase('cart', reverse('cart'), cart=True),
+        BenchmarkCase('checkout', reverse('checkout'), cart=True),
+        BenchmarkCase('checkout_submit', reverse('checkout'), method='post', cart=True, data={
+            'name': 'Bench', 'email': 'bench@example.com', 'whatsapp_number': '',
+            'pickup_date': (timezone.localdate() + timedelta(days=1)).isoformat(),
+        }),
+        BenchmarkCase('order_confirmation', reverse('order_confirmation', args=[order.id if order else 0])),
+        BenchmarkCase('order_history', reverse('order_history'), login=True),
+        BenchmarkCase('register', reverse('register')),
+        BenchmarkCase('login', reverse('login')),
+        BenchmarkCase('logout', reverse('logout'), login=True),
+        BenchmarkCase('search', reverse('search') + f'?q={word}'),
+        BenchmarkCase('search_suggestions', reverse('search_suggestions') + f'?q={word[:3]}'),
+        BenchmarkCase('search_results', reverse('search_results') + f'?q={word}'),
+        BenchmarkCase('apply_coupon', reverse('apply_coupon'), method='post', cart=True,
+                      data={'coupon_code': coupon.code if coupon else 'NONE'}),
+        BenchmarkCase('privacy_policy', reverse('privacy_policy')),
+        BenchmarkCase('terms_conditions', reverse('terms_conditions')),
+    ]
+
+
+def uncovered_url_names(cases) -> list:
+    """URL names in rose_cakes.urls that no case requests."""
+    from . import urls
+    covered = {case.name for case in cases}
+    return sorted(p.name for p in urls.urlpatterns if p.name and p.name not in covered)
+
+
+def percentile(values, pct) -> float:
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+@dataclass
+class CaseResult:
+    name: str
+    requests: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    queries: int
+    queries_per_request: float
+    statuses: list
+
+
+def _prepare(client, case, user, cart_ids):
+    if case.login and user is not None:
+        client.force_login(user)
+    if case.cart and cart_ids:
+        store = SignedCookieCartStore(RequestFactory().get('/'))
+        store.replace({cake_id: 1 for cake_id in cart_ids})
+        response = HttpResponse()
+        store.save(response)
+        client.cookies[cookie_name()] = response.cookies[cookie_name()].value
+
+
+def run_case(case, repeat=30, warmup=3, user=None, cart_ids=()) -> CaseResult:
+    """Time ``repeat`` requests of ``case`` after ``warmup`` untimed ones, each from a fresh client."""
+    timings, queries, statuses = [], 0, set()
+    for n in range(warmup + repeat):
+        client = Client(raise_request_exception=False)
+        _prepare(client, case, user, cart_ids)
+        request = getattr(client, case.method)
+        timing = RequestTiming()
+        with ExitStack() as stack:
+            # Storefront reads go to the read-only alias (rose_cakes.routers), so count on every alias
+            for alias_connection in connections.all():
+                stack.enter_context(alias_connection.execute_wrapper(timing))
+            started = time.perf_counter()
+            response = request(case.url, case.data or {}, headers=case.headers)
+            elapsed = time.perf_counter() - started
+        if n < warmup:
+            continue
+        timings.append(elapsed * 1000)
+        queries += timing.queries
+        statuses.add(response.status_code)
+    return CaseResult(
+        name=case.name,
+        requests=repeat,
+        p50_ms=round(percentile(timings, 50), 3),
+        p95_ms=round(percentile(timings, 95), 3),
+        p99_ms=round(percentile(timings, 99), 3),
+        queries=queries,
+        queries_per_request=round(queries / repeat, 2),
+        statuses=sorted(statuses),
+    )
+
+
+def run_cases(cases, repeat=30, warmup=3, progress=None) -> list:
+    """Run every case against the current database; returns CaseResults in case order."""
+    # A customer with order history, for the signed-in pages
+    user = User.objects.filter(order__isnull=False).order_by('id').first() or User.objects.order_by('id').first()
+    cart_ids = list(Cake.objects.order_by('id').values_list('id', flat=True)[:3])
+    cache.clear()
+    results = []
+    for case in cases:
+        result = run_case(case, repeat, warmup, user, cart_ids)
+        if progress:
+            progress(result)
+        results.append(result)
+    return results
+
+
+def results_to_baseline(results) -> dict:
+    return {result.name: asdict(result) for result in results}
+
+
+def compare(results, baseline, tolerance=0.25, min_ms=2.0) -> list:
+    """Regressions of ``results`` against a baseline dict, as messages.
+
+    New server errors and any rise in queries per request count. Latency
+    counts when p95 grew by more than ``tolerance`` and by at least
+    ``min_ms``, so timer noise on fast views is ignored.
+    """
+    problems = []
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None:
+            continue
+        if result.queries_per_request > before['queries_per_request']:
+            problems.append(f"{result.name}: {result.queries_per_request} queries per request, "
+                            f"baseline {before['queries_per_request']}")
+        errors = [status for status in result.statuses if status >= 500 and status not in before['statuses']]
+        if errors:
+            problems.append(f"{result.name}: now answers {', '.join(map(str, errors))}")
+        limit = before['p95_ms'] * (1 + tolerance)
+        if result.p95_ms > limit and result.p95_ms - before['p95_ms'] >= min_ms:
+            problems.append(f"{result.name}: p95 {result.p95_ms:.1f} ms, baseline {before['p95_ms']:.1f} ms")
+    return problems
@@ -0,0 +1,101 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+SITE_SETTINGS_CACHE_KEY = 'rose_cakes:site_settings'
+
+# (settings_instance_or_None, monotonic expiry) for this process
+_local_site_settings = None
+
+
+def _local_ttl() -> float:
+    return getattr(settings, 'SITE_SETTINGS_LOCAL_TTL', 30)
+
+
+def get_site_settings():
+    """Return the SiteSettings row, served from a per-process copy backed by the shared cache.
+
+    The process-local copy lives for SITE_SETTINGS_LOCAL_TTL seconds so that other
+    workers pick up an edit within that window once the shared entry is dropped.
+    """
+    global _local_site_settings
+    now = time.monotonic()
+    local = _local_site_settings
+    if local is not None and now < local[1]:
+        return local[0]
+
+    # Stored wrapped in a tuple so "no settings row yet" is cached too
+    wrapped = cache.get(SITE_SETTINGS_CACHE_KEY)
+    if wrapped is None:
+        from .models import SiteSettings
+        wrapped = (SiteSettings.get_settings(),)
+        cache.set(SITE_SETTINGS_CACHE_KEY, wrapped, None)
+
+    _local_site_settings = (wrapped[0], now + _local_ttl())
+    return wrapped[0]
+
+
+def invalidate_site_settings() -> None:
+    global _local_site_settings
+    _local_site_settings = None
+    cache.delete(SITE_SETTINGS_CACHE_KEY)
+
+
+CARD_VERSION_PREFIX = 'rose_cakes:card_version'
+
+
+def _card_version_key(kind: str, pk) -> str:
+    return f'{CARD_VERSION_PREFIX}:{kind}:{pk}'
+
+
+def annotate_card_versions(cakes) -> list:
+    """Set ``card_version`` on each cake for the cake card fragment cache key.
+
+    It combines the cake's version and its category's version. All of them are
+    read in one cache round trip.
+    """
+    cakes = list(cakes)
+    keys = {_card_version_key('cake', cake.pk) for cake in cakes}
+    keys |= {_card_version_key('category', cake.category_id) for cake in cakes if cake.category_id}
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys - versions.keys()}
+    if missing:
+        # Evicted or never bumped: start a new generation rather than reuse an old card
+        cache.set_many(missing, None)
+        versions.update(missing)
+    for cake in cakes:
+        category = versions.get(_card_version_key('category', cake.category_id), 0)
+        cake.card_version = f"{versions[_card_version_key('cake', cake.pk)]}.{category}"
+    return cakes
+
+
+def invalidate_cake_card(cake_id) -> None:
+    cache.set(_card_version_key('cake', cake_id), time.time_ns(), None)
+
+
+def invalidate_cake_cards(cake_ids) -> None:
+    """invalidate_cake_card for many cakes in one cache round trip."""
+    version = time.time_ns()
+    cache.set_many({_card_version_key('cake', cake_id): version for cake_id in cake_ids}, None)
+
+
+def invalidate_category_cards(category_id) -> None:
+    cache.set(_card_version_key('category', category_id), time.time_ns(), None)
+
+
+CATALOG_VERSION_CACHE_KEY = 'rose_cakes:catalog_version'
+
+
+def catalog_version() -> int:
+    """Nanosecond stamp of the last menu, offer or site settings write, for conditional GETs."""
+    version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    if version is None:
+        # Unknown after an eviction or restart: assume everything changed now
+        cache.add(CATALOG_VERSION_CACHE_KEY, time.time_ns(), None)
+        version = cache.get(CATALOG_VERSION_CACHE_KEY)
+    return version
+
+
+def bump_catalog_version() -> None:
+    cache.set(CATALOG_VERSION_CACHE_KEY, time.time_ns(), None)
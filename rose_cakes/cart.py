@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from decimal import Decimal
+
+from .models import Cake
+
+
+@dataclass(frozen=True)
+class CartLine:
+    cake: Cake
+    quantity: int
+    subtotal: Decimal
+
+    @property
+    def total_price(self):
+        # Name used by cart.html
+        return self.subtotal
+
+
+@dataclass(frozen=True)
+class PricedCart:
+    lines: tuple
+    total: Decimal
+    total_items: int
+    # Cart keys whose cake no longer exists (or never parsed as an id)
+    stale_keys: tuple = ()
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+
+def _parse(cart):
+    parsed = []
+    stale = []
+    for key, quantity in cart.items():
+        try:
+            parsed.append((key, int(key), int(quantity)))
+        except (TypeError, ValueError):
+            stale.append(key)
+    return parsed, stale
+
+
+def _priced(parsed, stale, cakes) -> PricedCart:
+    lines = []
+    total = Decimal('0')
+    total_items = 0
+    for key, cake_id, quantity in parsed:
+        cake = cakes.get(cake_id)
+        if cake is None or quantity < 1:
+            stale.append(key)
+            continue
+        subtotal = cake.price * quantity
+        total += subtotal
+        total_items += quantity
+        lines.append(CartLine(cake=cake, quantity=quantity, subtotal=subtotal))
+
+    return PricedCart(lines=tuple(lines), total=total, total_items=total_items, stale_keys=tuple(stale))
+
+
+def price_cart(cart) -> PricedCart:
+    """Resolve a cart ({cake_id: quantity}) with a single query.
+
+    Lines keep the cart's insertion order. Ids that no longer match a cake are
+    reported in ``stale_keys`` rather than raising.
+    """
+    parsed, stale = _parse(cart)
+    cakes = Cake.objects.in_bulk([cake_id for _, cake_id, _ in parsed]) if parsed else {}
+    return _priced(parsed, stale, cakes)
+
+
+async def aprice_cart(cart) -> PricedCart:
+    """``price_cart`` for async views."""
+    parsed, stale = _parse(cart)
+    cakes = await Cake.objects.ain_bulk([cake_id for _, cake_id, _ in parsed]) if parsed else {}
+    return _priced(parsed, stale, cakes)
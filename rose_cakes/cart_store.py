@@ -0,0 +1,231 @@
+"""Where a visitor's cart lives between requests.
+
+Carts stay out of the database session, so browsing and adding to the cart
+never writes a django_session row. CART_STORE picks the backend:
+
+* ``SignedCookieCartStore`` (default) keeps the cart in a signed cookie.
+* ``CacheCartStore`` keeps it in the shared cache under a random id, and the
+  cookie only holds that id.
+
+``CartMiddleware`` puts the store on ``request.cart``. Changes made during a
+request are written once, after the view returns. Async views load the cart
+with ``await request.cart.aitems()`` before changing it.
+"""
+import secrets
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+CART_COOKIE_SALT = 'rose_cakes.cart'
+CART_CACHE_PREFIX = 'rose_cakes:cart'
+
+
+def cookie_name() -> str:
+    return getattr(settings, 'CART_COOKIE_NAME', 'cart')
+
+
+def cookie_age() -> int:
+    return getattr(settings, 'CART_COOKIE_AGE', 60 * 60 * 24 * 14)
+
+
+def encode_cart(items) -> str:
+    """Pack {cake_id: quantity} as ``id_qty`` pairs joined by dots, e.g. ``12_2.31_1``."""
+    return '.'.join(f'{cake_id}_{quantity}' for cake_id, quantity in items.items())
+
+
+def decode_cart(value) -> dict:
+    """Inverse of encode_cart. Malformed pairs are dropped."""
+    items = {}
+    for pair in (value or '').split('.'):
+        cake_id, _, quantity = pair.partition('_')
+        try:
+            cake_id, quantity = int(cake_id), int(quantity)
+        except ValueError:
+            continue
+        if cake_id > 0 and quantity > 0:
+            items[cake_id] = quantity
+    return items
+
+
+class CartStore:
+    """A visitor's cart as {cake_id: quantity}, loaded on first use.
+
+    Subclasses implement ``load`` and ``persist``.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._items = None
+        self.modified = False
+
+    @property
+    def items(self) -> dict:
+        if self._items is None:
+            self._items = self.load()
+            if not self._items:
+                self._import_session_cart()
+        return self._items
+
+    def _import_session_cart(self):
+        # Carts saved in the session before the store existed
+        if settings.SESSION_COOKIE_NAME not in self.request.COOKIES or not hasattr(self.request, 'session'):
+            return
+        legacy = self.request.session.get('cart')
+        if legacy:
+            self._items = decode_cart(encode_cart(legacy))
+            del self.request.session['cart']
+            self.modified = True
+
+    async def aitems(self) -> dict:
+        if self._items is None:
+            self._items = await self.aload()
+            if not self._items:
+                await self._aimport_session_cart()
+        return self._items
+
+    async def _aimport_session_cart(self):
+        if settings.SESSION_COOKIE_NAME not in self.request.COOKIES or not hasattr(self.request, 'session'):
+            return
+        legacy = await self.request.session.aget('cart')
+        if legacy:
+            self._items = decode_cart(encode_cart(legacy))
+            await self.request.session.apop('cart')
+            self.modified = True
+
+    def add(self, cake_id, quantity=1):
+        self.items[int(cake_id)] = self.items.get(int(cake_id), 0) + quantity
+        self.modified = True
+
+    def remove_one(self, cake_id):
+        cake_id = int(cake_id)
+        if cake_id in self.items:
+            if self.items[cake_id] > 1:
+                self.items[cake_id] -= 1
+            else:
+                del self.items[cake_id]
+            self.modified = True
+
+    def replace(self, items):
+        self._items = {int(cake_id): int(quantity) for cake_id, quantity in items.items()}
+        self.modified = True
+
+    def clear(self):
+        self.replace({})
+
+    def discard(self, cake_ids):
+        """Drop entries, e.g. the ``stale_keys`` price_cart reported."""
+        for cake_id in cake_ids:
+            if self.items.pop(cake_id, None) is not None:
+                self.modified = True
+
+    def save(self, response):
+        if self.modified:
+            self.persist(response)
+            self.modified = False
+
+    async def asave(self, response):
+        if self.modified:
+            await self.apersist(response)
+            self.modified = False
+
+    def load(self) -> dict:
+        raise NotImplementedError
+
+    def persist(self, response):
+        raise NotImplementedError
+
+    # Cookie-only stores do no I/O, so the async versions default to the sync ones
+
+    async def aload(self) -> dict:
+        return self.load()
+
+    async def apersist(self, response):
+        self.persist(response)
+
+
+class SignedCookieCartStore(CartStore):
+    def load(self):
+        return decode_cart(self.request.get_signed_cookie(cookie_name(), None, salt=CART_COOKIE_SALT))
+
+    def persist(self, response):
+        if not self._items:
+            response.delete_cookie(cookie_name(), samesite='Lax')
+            return
+        response.set_signed_cookie(cookie_name(), encode_cart(self._items), salt=CART_COOKIE_SALT,
+                                   max_age=cookie_age(), httponly=True, samesite='Lax')
+
+
+class CacheCartStore(CartStore):
+    """Cart in the shared cache. The cookie only carries a signed random cart id."""
+
+    def __init__(self, request):
+        super().__init__(request)
+        self.cart_id = request.get_signed_cookie(cookie_name(), None, salt=CART_COOKIE_SALT)
+
+    def _key(self):
+        return f'{CART_CACHE_PREFIX}:{self.cart_id}'
+
+    def load(self):
+        if not self.cart_id:
+            return {}
+        return decode_cart(cache.get(self._key()))
+
+    async def aload(self):
+        if not self.cart_id:
+            return {}
+        return decode_cart(await cache.aget(self._key()))
+
+    def _set_cookie(self, response):
+        if not self.cart_id:
+            self.cart_id = secrets.token_urlsafe(16)
+            response.set_signed_cookie(cookie_name(), self.cart_id, salt=CART_COOKIE_SALT,
+                                       max_age=cookie_age(), httponly=True, samesite='Lax')
+
+    def persist(self, response):
+        if not self._items:
+            if self.cart_id:
+                cache.delete(self._key())
+            return
+        self._set_cookie(response)
+        cache.set(self._key(), encode_cart(self._items), cookie_age())
+
+    async def apersist(self, response):
+        if not self._items:
+            if self.cart_id:
+                await cache.adelete(self._key())
+            return
+        self._set_cookie(response)
+        await cache.aset(self._key(), encode_cart(self._items), cookie_age())
+
+
+def get_cart_store(request) -> CartStore:
+    backend = getattr(settings, 'CART_STORE', 'rose_cakes.cart_store.SignedCookieCartStore')
+    return import_string(backend)(request)
+
+
+class CartMiddleware:
+    """Attach ``request.cart`` and write it back once per request."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.cart = get_cart_store(request)
+        response = self.get_response(request)
+        request.cart.save(response)
+        return response
+
+    async def __acall__(self, request):
+        request.cart = get_cart_store(request)
+        response = await self.get_response(request)
+        await request.cart.asave(response)
+        return response
@@ -0,0 +1,243 @@
+"""Bulk catalog import: stream CSV or JSON Lines rows into Category and Cake.
+
+Rows are read, matched and written one chunk at a time, so memory stays flat
+however long the input is. A row updates the cake with its ``id`` when it has
+one, otherwise the first cake with its name, and creates a cake when neither
+exists. Categories are matched by name and created as needed. Optional
+columns that are missing or empty leave the stored value alone.
+"""
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+
+from .caching import invalidate_cake_cards
+from .images import import_image
+from .models import Cake, Category
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, format):
+    """Yield ``(line number, raw row dict)`` from a CSV (with a header) or JSON Lines stream."""
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, RowError(f"invalid JSON: {e}")
+            continue
+        yield line_number, row if isinstance(row, dict) else RowError("not a JSON object")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _text(row, key):
+    value = row.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _decimal(row, key, max_digits, required=False):
+    value = _text(row, key)
+    if value is None:
+        if required:
+            raise RowError(f"{key} is required")
+        return None
+    try:
+        number = Decimal(value).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError(f"{key} {value!r} is not a number")
+    if number < 0 or len(number.as_tuple().digits) > max_digits:
+        raise RowError(f"{key} {value!r} is out of range")
+    return number
+
+
+def parse_row(row) -> dict:
+    """Validate one raw row into cake values; None marks a value to leave alone."""
+    if isinstance(row, RowError):
+        raise row
+    name = _text(row, 'name')
+    if name is None:
+        raise RowError("name is required")
+    if len(name) > Cake._meta.get_field('name').max_length:
+        raise RowError("name is too long")
+    cake_id = _text(row, 'id')
+    if cake_id is not None and not cake_id.isdigit():
+        raise RowError(f"id {cake_id!r} is not a number")
+    featured = _text(row, 'featured')
+    if featured is not None:
+        if featured.lower() not in TRUE_VALUES | FALSE_VALUES:
+            raise RowError(f"featured {featured!r} is not true or false")
+        featured = featured.lower() in TRUE_VALUES
+    category = _text(row, 'category')
+    if category is not None and len(category) > Category._meta.get_field('name').max_length:
+        raise RowError("category is too long")
+    return {
+        'id': int(cake_id) if cake_id is not None else None,
+        'name': name,
+        'description': _text(row, 'description'),
+        'price': _decimal(row, 'price', 10, required=True),
+        'weight': _decimal(row, 'weight', 5),
+        'featured': featured,
+        'category': category,
+        'image': _text(row, 'image'),
+    }
+
+
+@dataclass
+class ChunkResult:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    images: int = 0
+    # (line number, message) for skipped rows and ignored values
+    errors: list = field(default_factory=list)
+
+
+class CatalogImporter:
+    """Upserts chunks of parsed rows. Keeps only the category name -> id map between chunks.
+
+    ``image_dir`` is where the ``image`` column's file names are looked up;
+    ``pool`` is an executor that copies them into storage and generates their
+    derivatives. With ``dry_run`` nothing is written.
+    """
+
+    def __init__(self, image_dir=None, pool=None, dry_run=False):
+        self.image_dir = image_dir
+        self.pool = pool
+        self.dry_run = dry_run
+        self.categories = {}
+
+    def _category_ids(self, names):
+        unknown = names - self.categories.keys()
+        if not unknown:
+            return
+        for name, pk in Category.objects.filter(name__in=unknown).order_by('-id').values_list('name', 'id'):
+            self.categories[name] = pk
+        missing = unknown - self.categories.keys()
+        if not missing:
+            return
+        if self.dry_run:
+            self.categories.update(dict.fromkeys(missing))
+            return
+        Category.objects.bulk_create([Category(name=name) for name in sorted(missing)])
+        self.categories.update(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+
+    def _images(self, rows, result):
+        """Map each referenced image file name to its stored name; missing files are errors."""
+        wanted = {}
+        for line_number, row in rows:
+            if row['image'] is None:
+                continue
+            path = os.path.join(self.image_dir or '', row['image'])
+            if self.image_dir is None or not os.path.isfile(path):
+                result.errors.append((line_number, f"image {row['image']!r} not found"))
+                row['image'] = None
+            else:
+                wanted[row['image']] = path
+        if self.dry_run or not wanted:
+            return {filename: filename for filename in wanted}
+        upload_to = Cake._meta.get_field('image').upload_to
+        names = list(wanted)
+        paths = [wanted[name] for name in names]
+        if self.pool is None:
+            stored = [import_image(path, upload_to) for path in paths]
+        else:
+            stored = self.pool.map(import_image, paths, [upload_to] * len(paths), chunksize=4)
+        result.images = len(names)
+        return dict(zip(names, stored))
+
+    def run(self, raw_rows, chunk_size=1000):
+        """Parse and upsert ``(line number, raw row)`` pairs a chunk at a time, yielding each ChunkResult."""
+        for chunk in chunked(raw_rows, chunk_size):
+            rows, errors = [], []
+            for line_number, raw in chunk:
+                try:
+                    rows.append((line_number, parse_row(raw)))
+                except RowError as e:
+                    errors.append((line_number, str(e)))
+            result = self.import_chunk(rows)
+            result.rows += len(errors)
+            result.skipped += len(errors)
+            result.errors = sorted(errors + result.errors)
+            yield result
+
+    def import_chunk(self, rows) -> ChunkResult:
+        """Upsert ``rows``, a list of ``(line number, parsed row)``, with one bulk INSERT and one bulk UPDATE."""
+        result = ChunkResult(rows=len(rows))
+        self._category_ids({row['category'] for _, row in rows if row['category']})
+        images = self._images(rows, result)
+
+        by_id = Cake.objects.in_bulk([row['id'] for _, row in rows if row['id'] is not None])
+        by_name = {}
+        names = {row['name'] for _, row in rows if row['id'] is None}
+        for cake in Cake.objects.filter(name__in=names).order_by('-id'):
+            by_name[cake.name] = cake
+
+        created, updated, changed_fields = {}, {}, set()
+        for line_number, row in rows:
+            if row['id'] is not None:
+                cake = by_id.get(row['id'])
+                if cake is None:
+                    result.errors.append((line_number, f"no cake with id {row['id']}"))
+                    result.skipped += 1
+                    continue
+            else:
+                cake = by_name.get(row['name'])
+                if cake is None:
+                    # Later rows with the same name update this new cake
+                    cake = by_name[row['name']] = Cake(name=row['name'], description='')
+                    created[row['name']] = cake
+            values = {
+                'name': row['name'],
+                'description': row['description'],
+                'price': row['price'],
+                'weight': row['weight'],
+                'featured': row['featured'],
+                'category_id': self.categories.get(row['category']) if row['category'] else None,
+                'image': images.get(row['image']),
+            }
+            for name, value in values.items():
+                if value is None or (name == 'category_id' and row['category'] is None):
+                    continue
+                current = cake.image.name if name == 'image' else getattr(cake, name)
+                if current != value:
+                    setattr(cake, name, value)
+                    if cake.pk is not None:
+                        changed_fields.add(name)
+                        updated[cake.pk] = cake
+        result.created = len(created)
+        result.updated = len(updated)
+        if self.dry_run:
+            return result
+
+        with transaction.atomic():
+            Cake.objects.bulk_create(created.values(), batch_size=500)
+            if updated:
+                Cake.objects.bulk_update(updated.values(), sorted(changed_fields), batch_size=500)
+        # bulk writes skip post_save: drop the cached cards of the cakes that changed
+        invalidate_cake_cards(updated)
+        return result
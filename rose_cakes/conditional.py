@@ -0,0 +1,72 @@
+"""Conditional GET support for the menu pages and endpoints.
+
+ETags and Last-Modified come from the catalog version stamp alone, so a
+matching If-None-Match is answered with 304 before the view queries or renders.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .caching import catalog_version
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1('\x1f'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+
+def catalog_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(catalog_version() / 1e9, tz=dt_timezone.utc)
+
+
+def shared_etag(request, *args, **kwargs):
+    """ETag for responses that are the same for every visitor."""
+    return _digest(catalog_version(), request.get_full_path())
+
+
+def visitor_etag(request, *args, **kwargs):
+    """ETag for pages that also show per-visitor state (login, CSRF token).
+
+    The session and CSRF cookies stand in for that state, so no session or user
+    lookup is needed. Logging in or out rotates both.
+    """
+    if request.COOKIES.get(getattr(settings, 'MESSAGE_COOKIE_NAME', 'messages')):
+        # Pending flash messages must be rendered
+        return None
+    return _digest(
+        catalog_version(),
+        request.get_full_path(),
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME, ''),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    )
+
+
+def _revalidate(etag_func, private):
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=catalog_last_modified)(view)
+        # Caches may keep a copy but must check the ETag before reusing it
+        cache_control = {'no_cache': True, 'private' if private else 'public': True}
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                response = await conditional_view(request, *args, **kwargs)
+                patch_cache_control(response, **cache_control)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, **cache_control)
+            return response
+        return wrapper
+    return decorator
+
+
+shared_conditional = _revalidate(shared_etag, private=False)
+visitor_conditional = _revalidate(visitor_etag, private=True)
@@ -1,5 +1,8 @@
-from .models import SiteSettings
+from django.utils.functional import SimpleLazyObject
+
+from .caching import get_site_settings
 
 def site_settings(request):
     """Context processor to add site settings to all templates"""
-    return {'site_settings': SiteSettings.get_settings()}
+    # Resolved on first use, so pages that never read it never look it up
+    return {'site_settings': SimpleLazyObject(get_site_settings)}
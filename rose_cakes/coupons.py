@@ -0,0 +1,84 @@
+"""Coupon lookup and redemption.
+
+Lookups are cached per code for COUPON_CACHE_TIMEOUT seconds, unknown codes
+included, so retyped or guessed codes don't query the database each time;
+Coupon writes drop the entry (see signals.py). A cached coupon's
+``used_count`` may be behind: ``redeem`` re-checks everything with one
+conditional UPDATE, so concurrent checkouts can never take more than
+``usage_limit`` uses.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Coupon
+
+COUPON_CACHE_PREFIX = 'rose_cakes:coupon'
+
+
+class CouponUnavailable(Exception):
+    """The coupon was used up, ended or changed before it could be redeemed."""
+
+
+def coupon_cache_timeout() -> int:
+    return getattr(settings, 'COUPON_CACHE_TIMEOUT', 300)
+
+
+def normalize_code(code) -> str:
+    return (code or '').strip().upper()
+
+
+def _cache_key(code) -> str:
+    return f'{COUPON_CACHE_PREFIX}:{code}'
+
+
+def get_coupon(code):
+    """The coupon with ``code``, or None, from the cache when possible."""
+    code = normalize_code(code)
+    if not code:
+        return None
+    # Stored wrapped in a tuple so unknown codes are cached too
+    wrapped = cache.get(_cache_key(code))
+    if wrapped is None:
+        wrapped = (Coupon.objects.filter(code=code).first(),)
+        cache.set(_cache_key(code), wrapped, coupon_cache_timeout())
+    return wrapped[0]
+
+
+def is_usable(coupon, now=None) -> bool:
+    now = now or timezone.now()
+    return (coupon.active and coupon.valid_from <= now <= coupon.valid_until
+            and coupon.used_count < coupon.usage_limit)
+
+
+def find_coupon(code, now=None):
+    """The coupon with ``code`` if it looks usable now, else None. ``redeem`` has the final say."""
+    coupon = get_coupon(code)
+    return coupon if coupon is not None and is_usable(coupon, now) else None
+
+
+def redeem(coupon, now=None) -> bool:
+    """Take one use of ``coupon`` if it still has one; returns whether it did.
+
+    A single ``UPDATE ... SET used_count = used_count + 1 WHERE used_count <
+    usage_limit``, also matching the code, ``active`` and the validity window,
+    so a coupon edited since it was cached is refused too.
+    """
+    now = now or timezone.now()
+    taken = Coupon.objects.filter(
+        pk=coupon.pk,
+        code=coupon.code,
+        active=True,
+        valid_from__lte=now,
+        valid_until__gte=now,
+        used_count__lt=F('usage_limit'),
+    ).update(used_count=F('used_count') + 1)
+    if not taken:
+        # Let the next lookup see it used up (or gone)
+        invalidate_coupon(coupon.code)
+    return bool(taken)
+
+
+def invalidate_coupon(code) -> None:
+    cache.delete(_cache_key(normalize_code(code)))
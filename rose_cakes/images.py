@@ -0,0 +1,149 @@
+"""Resized WebP/JPEG copies of uploaded images, stored next to the original.
+
+``cakes/plum.jpg`` gets ``cakes/plum.320w.webp``, ``cakes/plum.320w.jpg`` and so
+on for each width in IMAGE_DERIVATIVE_WIDTHS narrower than the original.
+
+The widths found on storage are cached per image for
+IMAGE_DERIVATIVE_CACHE_TIMEOUT seconds, so rendering an image doesn't check
+storage for every width and format; ``generate_derivatives`` drops the entry
+when it writes.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+
+DERIVATIVES_CACHE_PREFIX = 'rose_cakes:derivatives'
+
+# (extension, Pillow format, mime type)
+DERIVATIVE_FORMATS = (
+    ('webp', 'WEBP', 'image/webp'),
+    ('jpg', 'JPEG', 'image/jpeg'),
+)
+
+# Every model field holding an uploaded image, as (app_label.Model, field name)
+IMAGE_FIELDS = (
+    ('rose_cakes.Cake', 'image'),
+    ('rose_cakes.SpecialOffer', 'image'),
+    ('rose_cakes.SiteSettings', 'logo'),
+    ('rose_cakes.SiteSettings', 'hero_image'),
+    ('rose_cakes.SiteSettings', 'about_image_1'),
+    ('rose_cakes.SiteSettings', 'about_image_2'),
+    ('rose_cakes.SiteSettings', 'about_image_3'),
+    ('rose_cakes.SiteSettings', 'about_image_4'),
+)
+
+
+def derivative_widths() -> tuple:
+    return tuple(sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 960))))
+
+
+def derivative_quality() -> int:
+    return getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80)
+
+
+def derivative_cache_timeout() -> int:
+    return getattr(settings, 'IMAGE_DERIVATIVE_CACHE_TIMEOUT', 300)
+
+
+def derivative_name(name: str, width: int, extension: str) -> str:
+    root, _ = os.path.splitext(name)
+    return f'{root}.{width}w.{extension}'
+
+
+def available_derivatives(name: str, storage=None) -> dict:
+    """Map each derivative extension to the widths already generated for ``name``, from the cache when possible."""
+    available = cache.get(_derivatives_cache_key(name))
+    if available is None:
+        storage = storage or default_storage
+        available = {
+            extension: [w for w in derivative_widths() if storage.exists(derivative_name(name, w, extension))]
+            for extension, _, _ in DERIVATIVE_FORMATS
+        }
+        cache.set(_derivatives_cache_key(name), available, derivative_cache_timeout())
+    return available
+
+
+def _derivatives_cache_key(name: str) -> str:
+    return f'{DERIVATIVES_CACHE_PREFIX}:{name}'
+
+
+def _shown_width(image) -> int:
+    # EXIF orientations 5-8 turn the image a quarter turn, so its stored height is the width shown
+    if image.getexif().get(ExifTags.Base.Orientation, 1) in (5, 6, 7, 8):
+        return image.height
+    return image.width
+
+
+def _encode(image, width, image_format) -> bytes:
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS)
+    if image_format == 'JPEG' and resized.mode != 'RGB':
+        background = Image.new('RGB', resized.size, 'white')
+        background.paste(resized, mask=resized.getchannel('A') if 'A' in resized.getbands() else None)
+        resized = background
+    buffer = BytesIO()
+    resized.save(buffer, image_format, quality=derivative_quality(), optimize=True)
+    return buffer.getvalue()
+
+
+def generate_derivatives(name: str, storage=None) -> int:
+    """Write the missing derivatives of image ``name`` and return how many were written.
+
+    Derivatives that already exist are left alone, and so are the widths the
+    original is too narrow for, so this is safe to re-run and only decodes the
+    original when something is missing. Unreadable or missing originals are
+    skipped.
+    """
+    storage = storage or default_storage
+    missing = [
+        (width, extension, image_format)
+        for width in derivative_widths()
+        for extension, image_format, _ in DERIVATIVE_FORMATS
+        if not storage.exists(derivative_name(name, width, extension))
+    ]
+    if not missing:
+        return 0
+    try:
+        with storage.open(name, 'rb') as original:
+            image = Image.open(original)
+            # Never upscale: the original already covers anything wider. Only its header is read so far
+            wanted = [entry for entry in missing if entry[0] < _shown_width(image)]
+            if not wanted:
+                return 0
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        return 0
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.getbands() else 'RGB')
+
+    for width, extension, image_format in wanted:
+        storage.save(derivative_name(name, width, extension), ContentFile(_encode(image, width, image_format)))
+    cache.delete(_derivatives_cache_key(name))
+    return len(wanted)
+
+
+def image_names(model, field_name) -> set:
+    """Names of the stored images in one image field, across all rows."""
+    names = model.objects.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+    return set(names.values_list(field_name, flat=True))
+
+
+def import_image(path: str, upload_to: str, storage=None) -> str:
+    """Copy the local file ``path`` into storage under ``upload_to`` and generate its derivatives.
+
+    A stored file of the same name and size is reused, so re-running an import
+    does not pile up copies. Returns the stored name.
+    """
+    storage = storage or default_storage
+    name = os.path.join(upload_to, os.path.basename(path))
+    if not (storage.exists(name) and storage.size(name) == os.path.getsize(path)):
+        with open(path, 'rb') as source:
+            name = storage.save(name, source)
+    generate_derivatives(name, storage)
+    return name
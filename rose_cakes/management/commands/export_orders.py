@@ -0,0 +1,47 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from rose_cakes.models import Order
+from rose_cakes.order_export import EXPORT_FORMATS, export_lines
+
+
+def _parse_date(value, option):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"{option} must be a date like 2026-01-31, not {value!r}.")
+
+
+class Command(BaseCommand):
+    help = "Stream orders and their items as CSV (one line per item) or JSON Lines (one object per order)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help='File to write; standard output by default.')
+        parser.add_argument('--since', help='Only orders placed on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--until', help='Only orders placed on or before this date (YYYY-MM-DD).')
+        parser.add_argument('--status', action='append', choices=[value for value, _ in Order.STATUS_CHOICES],
+                            help='Only orders in this status; repeat for several.')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Orders fetched per query.')
+
+    def handle(self, *args, **options):
+        orders = Order.objects.order_by('created_at', 'id')
+        if options['since']:
+            since = _parse_date(options['since'], '--since')
+            orders = orders.filter(created_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+        if options['until']:
+            until = _parse_date(options['until'], '--until') + timedelta(days=1)
+            orders = orders.filter(created_at__lt=timezone.make_aware(datetime.combine(until, time.min)))
+        if options['status']:
+            orders = orders.filter(status__in=options['status'])
+
+        lines = export_lines(orders, options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
+            self.stderr.write(f"Orders written to {options['output']}.")
+            return
+        for line in lines:
+            self.stdout.write(line, ending='')
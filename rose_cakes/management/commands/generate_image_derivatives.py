@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from rose_cakes.caching import bump_catalog_version, invalidate_cake_cards
+from rose_cakes.images import IMAGE_FIELDS, generate_derivatives, image_names
+
+
+def _init_worker():
+    # Needed where workers are spawned rather than forked; a no-op otherwise
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = "Generate the missing WebP/JPEG width derivatives for every uploaded cake, offer and site image."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes resizing images.')
+
+    def handle(self, *args, **options):
+        names = set()
+        for label, field in IMAGE_FIELDS:
+            names |= image_names(apps.get_model(label), field)
+        names = sorted(names)
+        if not names:
+            self.stdout.write("No images to process.")
+            return
+
+        written = processed = 0
+        done = set()
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']), initializer=_init_worker) as pool:
+            for name, count in zip(names, pool.map(generate_derivatives, names, chunksize=4)):
+                if count:
+                    processed += 1
+                    done.add(name)
+                    written += count
+                    self.stdout.write(f"{name}: {count} derivatives")
+        # Cached cards rendered before the derivatives existed lack the srcset
+        if done:
+            # Matched here: image__in over every name could exceed SQLite's parameter limit
+            cakes = apps.get_model('rose_cakes.Cake').objects.exclude(image='').values_list('pk', 'image')
+            invalidate_cake_cards([pk for pk, image in cakes if image in done])
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(names)} images checked, {processed} processed, {len(names) - processed} up to date; {written} files written."
+        ))
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from rose_cakes.caching import bump_catalog_version
+from rose_cakes.catalog_import import CatalogImporter, read_rows
+from rose_cakes.suggestions import invalidate_suggestion_index
+
+
+def _init_worker():
+    # Needed where workers are spawned rather than forked; a no-op otherwise
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = ("Create or update categories and cakes from a CSV or JSON Lines file, streamed in chunks. "
+            "Columns: name, price (required), id, description, weight, featured, category, image.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON Lines file, or '-' for standard input.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='Input format; guessed from the file extension by default.')
+        parser.add_argument('--images', help="Directory the image column's file names are looked up in.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows read and written per transaction.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes copying and resizing images.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report what would change without writing anything.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format']
+        if format is None:
+            if path == '-':
+                raise CommandError("--format is required when reading standard input.")
+            format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+        if options['images'] and not os.path.isdir(options['images']):
+            raise CommandError(f"Image directory {options['images']!r} does not exist.")
+
+        stream = nullcontext(sys.stdin) if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        needs_pool = options['images'] and not options['dry_run']
+        pool = ProcessPoolExecutor(max_workers=max(1, options['workers']), initializer=_init_worker) if needs_pool else nullcontext()
+        totals = dict.fromkeys(('rows', 'created', 'updated', 'skipped', 'images'), 0)
+        started = time.perf_counter()
+        with stream as rows, pool:
+            importer = CatalogImporter(options['images'], pool if needs_pool else None, options['dry_run'])
+            chunk_started = started
+            for number, result in enumerate(importer.run(read_rows(rows, format), options['chunk_size']), 1):
+                for line_number, message in result.errors:
+                    self.stderr.write(f"line {line_number}: {message}")
+                for key in totals:
+                    totals[key] += getattr(result, key)
+                now = time.perf_counter()
+                self.stdout.write(
+                    f"chunk {number}: {result.rows} rows, {result.created} created, {result.updated} updated, "
+                    f"{result.skipped} skipped, {result.images} images; "
+                    f"{result.rows / max(now - chunk_started, 1e-6):,.0f} rows/s"
+                )
+                chunk_started = now
+
+        if not options['dry_run'] and (totals['created'] or totals['updated']):
+            # bulk writes skip the post_save handlers that normally do this
+            invalidate_suggestion_index()
+            bump_catalog_version()
+        elapsed = time.perf_counter() - started
+        prefix = "Dry run, nothing written: " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{totals['rows']} rows in {elapsed:.1f}s ({totals['rows'] / max(elapsed, 1e-6):,.0f} rows/s): "
+            f"{totals['created']} created, {totals['updated']} updated, {totals['skipped']} skipped, "
+            f"{totals['images']} images."
+        ))
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rose_cakes.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollups behind the store-admin dashboard from the orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Only rebuild days from this date (YYYY-MM-DD) on; default is every day.')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"--since must be a date like 2026-01-31, not {options['since']!r}.")
+        written = rebuild(since)
+        scope = f"from {since}" if since else "for every day"
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups {scope}: {written} rows written."))
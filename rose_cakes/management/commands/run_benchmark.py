@@ -0,0 +1,80 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from rose_cakes.benchmark import compare, default_cases, results_to_baseline, run_cases, seed, uncovered_url_names
+
+from .seed_benchmark_data import add_size_arguments, sizes_from_options
+
+
+class Command(BaseCommand):
+    help = ("Time every storefront URL through the test client and report p50/p95/p99 latency and queries "
+            "per request. Runs against a throwaway seeded database unless --existing-data is given.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30, help='Timed requests per URL.')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per URL first.')
+        parser.add_argument('--only', action='append', help='Only this case (URL name); repeat for several.')
+        parser.add_argument('--baseline', help='Fail when the run regresses against this JSON baseline.')
+        parser.add_argument('--save-baseline', help='Write the results as a JSON baseline to this file.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 growth over the baseline (0.25 = 25%%).')
+        parser.add_argument('--min-ms', type=float, default=2.0, help='p95 growth below this many ms is never a regression.')
+        parser.add_argument('--existing-data', action='store_true',
+                            help='Use the configured database as it is. Checkout and cart cases write to it.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the throwaway database.')
+        add_size_arguments(parser)
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']!r}: {e}")
+
+        # Lets the test client through ALLOWED_HOSTS and keeps checkout emails in memory
+        try:
+            setup_test_environment()
+            own_environment = True
+        except RuntimeError:
+            own_environment = False  # already set up, e.g. under the test runner
+        old_databases = None
+        try:
+            if not options['existing_data']:
+                old_databases = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+                counts = seed(sizes_from_options(options), options['seed'])
+                self.stdout.write("Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items()) + ".")
+            results = self._run(options)
+        finally:
+            if old_databases is not None:
+                teardown_databases(old_databases, verbosity=0)
+            if own_environment:
+                teardown_test_environment()
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w', encoding='utf-8') as f:
+                json.dump(results_to_baseline(results), f, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline written to {options['save_baseline']}.")
+        if baseline is not None:
+            problems = compare(results, baseline, options['tolerance'], options['min_ms'])
+            if problems:
+                raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(problems))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def _run(self, options):
+        cases = default_cases()
+        missing = uncovered_url_names(cases)
+        if missing:
+            self.stderr.write(f"No benchmark case for: {', '.join(missing)}")
+        if options['only']:
+            cases = [case for case in cases if case.name in options['only']]
+        self.stdout.write(f"{'view':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'q/req':>6}  status")
+
+        def report(result):
+            self.stdout.write(
+                f"{result.name:<20} {result.p50_ms:>8.2f} {result.p95_ms:>8.2f} {result.p99_ms:>8.2f} "
+                f"{result.queries:>8} {result.queries_per_request:>6.1f}  {','.join(map(str, result.statuses))}"
+            )
+        return run_cases(cases, options['repeat'], options['warmup'], progress=report)
@@ -0,0 +1,34 @@
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rose_cakes.benchmark import SeedSizes, seed
+from rose_cakes.models import Cake
+
+
+def add_size_arguments(parser):
+    for size in fields(SeedSizes):
+        label = 'Days of order history' if size.name == 'days' else f'{size.name.capitalize()} to create'
+        parser.add_argument(f'--{size.name}', type=int, default=size.default, help=f'{label} (default {size.default}).')
+
+
+def sizes_from_options(options) -> SeedSizes:
+    return SeedSizes(**{size.name: options[size.name] for size in fields(SeedSizes)})
+
+
+class Command(BaseCommand):
+    help = "Bulk insert a reproducible catalog, customers and order history for benchmarking."
+
+    def add_arguments(self, parser):
+        add_size_arguments(parser)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--force', action='store_true', help='Seed even though the database already has cakes.')
+
+    def handle(self, *args, **options):
+        if Cake.objects.exists() and not options['force']:
+            raise CommandError("The database already has cakes; pass --force to add benchmark data anyway.")
+        counts = seed(sizes_from_options(options), options['seed'], options['batch_size'], progress=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items()) + "."
+        ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from rose_cakes.outbox import drain
+
+
+class Command(BaseCommand):
+    help = "Deliver queued email/WhatsApp notifications from the outbox, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain what is due now and exit instead of polling.')
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages claimed per batch.')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent WhatsApp sends per batch; emails share one SMTP connection.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, retrying, failed = drain(options['batch_size'], options['workers'])
+            if sent or retrying or failed:
+                self.stdout.write(f"sent={sent} retrying={retrying} failed={failed}")
+            if options['once']:
+                return
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
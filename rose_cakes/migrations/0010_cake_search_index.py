@@ -0,0 +1,85 @@
+from django.db import migrations
+
+# SQLite can't alter most columns in place, so for AlterField and similar
+# operations on rose_cakes_cake or rose_cakes_category Django copies the table
+# and drops the old one, which silently drops these triggers with it. A later
+# migration that rebuilds either table must create the triggers again and
+# refill the index. Until it does, rose_cakes.search.fts_available falls back
+# to LIKE searches; CakeSearchTests checks the triggers survive all migrations.
+
+FTS_TABLE = 'rose_cakes_cake_fts'
+
+CATEGORY_NAME = "COALESCE((SELECT name FROM rose_cakes_category WHERE id = new.category_id), '')"
+
+CREATE_SQL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, description, category_name,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '1 2 3'
+    )""",
+    f"""CREATE TRIGGER rose_cakes_cake_fts_ai AFTER INSERT ON rose_cakes_cake BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, category_name)
+        VALUES (new.id, new.name, new.description, {CATEGORY_NAME});
+    END""",
+    f"""CREATE TRIGGER rose_cakes_cake_fts_ad AFTER DELETE ON rose_cakes_cake BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER rose_cakes_cake_fts_au AFTER UPDATE OF name, description, category_id ON rose_cakes_cake BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, name, description, category_name)
+        VALUES (new.id, new.name, new.description, {CATEGORY_NAME});
+    END""",
+    f"""CREATE TRIGGER rose_cakes_category_fts_au AFTER UPDATE OF name ON rose_cakes_category BEGIN
+        UPDATE {FTS_TABLE} SET category_name = new.name
+        WHERE rowid IN (SELECT id FROM rose_cakes_cake WHERE category_id = new.id);
+    END""",
+    f"""INSERT INTO {FTS_TABLE}(rowid, name, description, category_name)
+        SELECT cake.id, cake.name, cake.description, COALESCE(category.name, '')
+        FROM rose_cakes_cake cake LEFT JOIN rose_cakes_category category ON category.id = cake.category_id""",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS rose_cakes_category_fts_au',
+    'DROP TRIGGER IF EXISTS rose_cakes_cake_fts_au',
+    'DROP TRIGGER IF EXISTS rose_cakes_cake_fts_ad',
+    'DROP TRIGGER IF EXISTS rose_cakes_cake_fts_ai',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def _fts5_supported(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute('CREATE VIRTUAL TABLE temp.rose_cakes_fts5_probe USING fts5(x)')
+            cursor.execute('DROP TABLE temp.rose_cakes_fts5_probe')
+        except Exception:
+            return False
+    return True
+
+
+def create_index(apps, schema_editor):
+    # Without FTS5 the search views keep using their LIKE queries
+    if not _fts5_supported(schema_editor.connection):
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rose_cakes', '0009_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
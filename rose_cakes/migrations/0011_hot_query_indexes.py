@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rose_cakes', '0010_cake_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cake',
+            index=models.Index(fields=['category', 'name', 'id'], name='cake_category_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cake',
+            index=models.Index(condition=models.Q(('featured', True)), fields=['featured'], name='cake_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['name', 'id'], name='category_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialoffer',
+            index=models.Index(fields=['active', 'valid_until', 'valid_from'], name='offer_active_window_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:40
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    # Existing orders only have their items; use the cakes' current names and weights
+    Order = apps.get_model('rose_cakes', 'Order')
+    OrderItem = apps.get_model('rose_cakes', 'OrderItem')
+    last_id = 0
+    while True:
+        # Orders by primary key ranges, and each range's items in one query
+        batch = list(Order.objects.filter(pk__gt=last_id).order_by('pk').only('id')[:500])
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        items_by_order = defaultdict(list)
+        items = OrderItem.objects.filter(order_id__in=[order.pk for order in batch]).select_related('cake').only(
+            'order', 'price', 'quantity', 'cake__name', 'cake__weight', 'cake__image',
+        ).order_by('id')
+        for item in items:
+            items_by_order[item.order_id].append(item)
+        for order in batch:
+            items = items_by_order[order.pk]
+            order.line_snapshot = [
+                {
+                    'cake_id': item.cake_id,
+                    'name': item.cake.name,
+                    'weight': str(item.cake.weight),
+                    'unit_price': str(item.price),
+                    'quantity': item.quantity,
+                    'subtotal': str(item.price * item.quantity),
+                    'image': item.cake.image.name or '',
+                }
+                for item in items
+            ]
+            order.item_count = sum(item.quantity for item in items)
+            order.items_total = sum((item.price * item.quantity for item in items), Decimal('0'))
+        Order.objects.bulk_update(batch, ['line_snapshot', 'item_count', 'items_total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rose_cakes', '0011_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='items_total',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Total before discounts', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='line_snapshot',
+            field=models.JSONField(blank=True, default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Cake name, weight, unit price, quantity and subtotal per line'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:43
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    Order = apps.get_model('rose_cakes', 'Order')
+    DailySales = apps.get_model('rose_cakes', 'DailySales')
+    DailyCakeSales = apps.get_model('rose_cakes', 'DailyCakeSales')
+
+    # Only the combined discount was stored: with no special offer it was all the
+    # coupon's, otherwise take the coupon's percentage of the pre-discount total
+    for order in Order.objects.filter(coupon__isnull=False).select_related('coupon'):
+        share = order.discount_amount
+        if order.special_offer_id:
+            share = min(share, (order.items_total * order.coupon.discount_percentage / 100).quantize(Decimal('0.01')))
+        order.coupon_discount = share
+        order.save(update_fields=['coupon_discount'])
+
+    sales = defaultdict(lambda: defaultdict(int))
+    cakes = defaultdict(lambda: defaultdict(int))
+    for order in Order.objects.order_by('pk').iterator(chunk_size=2000):
+        day = timezone.localdate(order.created_at)
+        row = sales[day, order.status]
+        row['orders'] += 1
+        row['revenue'] += order.total_amount
+        row['items_total'] += order.items_total
+        row['coupon_discount'] += order.coupon_discount
+        row['offer_discount'] += order.discount_amount - order.coupon_discount
+        if order.status == 'cancelled':
+            continue
+        for line in order.line_snapshot:
+            row = cakes[day, line['cake_id']]
+            row['units'] += line['quantity']
+            row['revenue'] += Decimal(str(line['subtotal']))
+    DailySales.objects.bulk_create(
+        [DailySales(day=day, status=status, **row) for (day, status), row in sales.items()], batch_size=500,
+    )
+    DailyCakeSales.objects.bulk_create(
+        [DailyCakeSales(day=day, cake_id=cake_id, **row) for (day, cake_id), row in cakes.items()], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rose_cakes', '0012_order_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='coupon_discount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text="Part of the discount from the coupon; the rest is the special offer's", max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('processing', 'Preparing'), ('ready_for_pickup', 'Ready for Pickup'), ('out_for_delivery', 'Out for Delivery'), ('picked_up', 'Picked Up'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Order totals after discounts', max_digits=12)),
+                ('items_total', models.DecimalField(decimal_places=2, default=0, help_text='Order totals before discounts', max_digits=12)),
+                ('coupon_discount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('offer_discount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily sales',
+                'constraints': [models.UniqueConstraint(fields=('day', 'status'), name='daily_sales_day_status_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCakeSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Line subtotals before discounts', max_digits=12)),
+                ('cake', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='rose_cakes.cake')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily cake sales',
+                'constraints': [models.UniqueConstraint(fields=('day', 'cake'), name='daily_cake_sales_day_cake_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
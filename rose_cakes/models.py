@@ -1,5 +1,9 @@
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
 class Category(models.Model):
@@ -7,6 +11,12 @@ class Category(models.Model):
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Category lists, and walking the catalog category by category
+            models.Index(fields=['name', 'id'], name='category_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -20,6 +30,14 @@ class Cake(models.Model):
     weight = models.DecimalField(max_digits=5, decimal_places=2, default=1.0, help_text="Weight in kg")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Catalog pages: cakes of one category (or none) in name order
+            models.Index(fields=['category', 'name', 'id'], name='cake_category_name_idx'),
+            # Homepage; only the few featured rows are indexed
+            models.Index(fields=['featured'], condition=models.Q(featured=True), name='cake_featured_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -36,6 +54,12 @@ class SpecialOffer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Offer schedule: active offers that have not ended yet
+            models.Index(fields=['active', 'valid_until', 'valid_from'], name='offer_active_window_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -87,13 +111,45 @@ class Order(models.Model):
     coupon = models.ForeignKey(Coupon, on_delete=models.SET_NULL, null=True, blank=True)
     special_offer = models.ForeignKey(SpecialOffer, on_delete=models.SET_NULL, null=True, blank=True)
     discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    coupon_discount = models.DecimalField(max_digits=10, decimal_places=2, default=0,
+                                          help_text="Part of the discount from the coupon; the rest is the special offer's")
     tracking_number = models.CharField(max_length=100, blank=True, null=True)
+    # Summary written once when the order is placed, so order pages, history and
+    # notifications render from this row alone, as the order was at the time
+    line_snapshot = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder,
+                                     help_text="Cake name, weight, unit price, quantity and subtotal per line")
+    item_count = models.PositiveIntegerField(default=0)
+    items_total = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Total before discounts")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # order_history: one user's orders, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+            # OrderAdmin: status filter with the default newest-first ordering
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            # OrderAdmin unfiltered list and date hierarchy
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.id} - {self.customer_name}"
 
+    @property
+    def lines(self):
+        """The line snapshot with amounts as Decimals and the image as a URL."""
+        return [
+            {
+                **line,
+                'weight': Decimal(line['weight']),
+                'unit_price': Decimal(line['unit_price']),
+                'subtotal': Decimal(line['subtotal']),
+                'image_url': default_storage.url(line['image']) if line.get('image') else '',
+            }
+            for line in self.line_snapshot
+        ]
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
     cake = models.ForeignKey(Cake, on_delete=models.CASCADE)
@@ -146,3 +202,80 @@ class SiteSettings(models.Model):
     def get_settings(cls):
         """Get the first (and typically only) site settings instance"""
         return cls.objects.first()
+
+class OutboxMessage(models.Model):
+    """A notification waiting to be (or already) delivered by the send_notifications worker."""
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('whatsapp', 'WhatsApp'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=200, blank=True)
+    body = models.TextField()
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} to {self.recipient} ({self.status})"
+
+
+class DailySales(models.Model):
+    """Orders placed on one day (store time zone) that are now in one status.
+
+    Kept up to date by rose_cakes.rollups as orders are placed and change
+    status; ``manage.py rebuild_sales_rollups`` recomputes it from the orders.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    # Plain integers: a counter that drifted must not block an order write
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Order totals after discounts")
+    items_total = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Order totals before discounts")
+    coupon_discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    offer_discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "Daily sales"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='daily_sales_day_status_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.orders} orders"
+
+class DailyCakeSales(models.Model):
+    """Units of one cake in the orders placed on one day, cancelled orders excluded."""
+    day = models.DateField()
+    # No FK constraint: the rollup outlives a deleted cake
+    cake = models.ForeignKey(Cake, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Line subtotals before discounts")
+
+    class Meta:
+        verbose_name_plural = "Daily cake sales"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'cake'], name='daily_cake_sales_day_cake_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} cake {self.cake_id}: {self.units}"
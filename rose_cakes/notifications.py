@@ -1,27 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection, send_mail
 from django.utils import timezone
-from .models import SiteSettings, Order
+from .models import Order, OutboxMessage
+from .caching import get_site_settings
+from .timing import timed_notifications
 import json
 import urllib.request
 
 
+def _from_email() -> str:
+    return getattr(settings, 'DEFAULT_FROM_EMAIL', getattr(settings, 'EMAIL_HOST_USER', 'webmaster@localhost'))
+
+
 def _send_email(recipient_email: str, subject: str, message: str) -> None:
-    if not recipient_email:
-        return
-    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', getattr(settings, 'EMAIL_HOST_USER', 'webmaster@localhost'))
-    try:
-        send_mail(subject, message, from_email, [recipient_email], fail_silently=True)
-    except Exception:
-        pass
+    from_email = _from_email()
+    # Raises on failure so the outbox worker can retry
+    send_mail(subject, message, from_email, [recipient_email])
 
 
-def _send_whatsapp(phone_e164: str, message: str) -> None:
+def _whatsapp_configured() -> bool:
     # Uses WhatsApp Cloud API if settings.WHATSAPP_TOKEN and settings.WHATSAPP_PHONE_ID are configured
+    return bool(getattr(settings, 'WHATSAPP_TOKEN', None) and getattr(settings, 'WHATSAPP_PHONE_ID', None))
+
+
+def _send_whatsapp(phone_e164: str, message: str) -> None:
     token = getattr(settings, 'WHATSAPP_TOKEN', None)
     phone_id = getattr(settings, 'WHATSAPP_PHONE_ID', None)
-    if not token or not phone_id or not phone_e164:
-        return
     url = f"https://graph.facebook.com/v19.0/{phone_id}/messages"
     payload = {
         "messaging_product": "whatsapp",
@@ -34,10 +39,8 @@ def _send_whatsapp(phone_e164: str, message: str) -> None:
         'Authorization': f'Bearer {token}',
         'Content-Type': 'application/json'
     })
-    try:
-        urllib.request.urlopen(req, timeout=10)
-    except Exception:
-        # Silently ignore failures to avoid blocking app flow
+    # HTTP errors raise, so the outbox worker can retry
+    with urllib.request.urlopen(req, timeout=10):
         pass
 
 
@@ -48,6 +51,9 @@ def _format_admin_new_order_message(order: Order) -> str:
         f"Email: {order.customer_email}",
         f"WhatsApp: {order.whatsapp_number or '-'}",
         f"Pickup date: {order.pickup_date}",
+        f"Items ({order.item_count}):",
+        *(f"  {line['quantity']} x {line['name']} ({line['weight']} kg) - ₹{line['subtotal']}"
+          for line in order.line_snapshot),
         f"Total: ₹{order.total_amount}",
         f"Created: {timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M')}",
         "Status: Pending",
@@ -75,8 +81,24 @@ def _format_user_status_message(order: Order) -> str:
     )
 
 
-def notify_admin_new_order(order: Order) -> None:
-    site = SiteSettings.get_settings()
+def _build(order: Order, email: str, whatsapp: str, subject: str, body: str) -> list:
+    messages = []
+    if email:
+        messages.append(OutboxMessage(channel='email', recipient=email, subject=subject, body=body, order=order))
+    if whatsapp and _whatsapp_configured():
+        messages.append(OutboxMessage(channel='whatsapp', recipient=whatsapp, subject=subject, body=body, order=order))
+    return messages
+
+
+def _build_user_status(order: Order) -> list:
+    subject = f"Your Order #{order.id} Update"
+    body = _format_user_status_message(order)
+    return _build(order, order.customer_email, order.whatsapp_number, subject, body)
+
+
+def notify_admin_new_order(order: Order) -> list:
+    """Queue the new-order alert for the store admin; call inside the order's transaction."""
+    site = get_site_settings()
     admin_email = site.email if site and site.email else getattr(settings, 'EMAIL_HOST_USER', None)
     admin_whatsapp = None
     if site and site.whatsapp_number:
@@ -85,14 +107,79 @@ def notify_admin_new_order(order: Order) -> None:
 
     subject = f"New Order #{order.id} - Pending"
     body = _format_admin_new_order_message(order)
-    _send_email(admin_email, subject, body)
-    _send_whatsapp(admin_whatsapp, body)
+    return OutboxMessage.objects.bulk_create(_build(order, admin_email, admin_whatsapp, subject, body))
 
 
-def notify_user_order_status(order: Order) -> None:
-    subject = f"Your Order #{order.id} Update"
-    body = _format_user_status_message(order)
-    _send_email(order.customer_email, subject, body)
-    _send_whatsapp(order.whatsapp_number, body)
+def notify_user_order_status(order: Order) -> list:
+    """Queue a status update for the customer; call inside the status change's transaction."""
+    return OutboxMessage.objects.bulk_create(_build_user_status(order))
+
+
+def notify_users_order_status(orders) -> list:
+    """Queue status updates for many orders with a single INSERT."""
+    messages = []
+    for order in orders:
+        messages.extend(_build_user_status(order))
+    return OutboxMessage.objects.bulk_create(messages)
+
+
+def deliver(message: OutboxMessage) -> None:
+    """Send one outbox message now. Raises if the provider rejects it."""
+    if message.channel == 'email':
+        _send_email(message.recipient, message.subject, message.body)
+    elif message.channel == 'whatsapp':
+        _send_whatsapp(message.recipient, message.body)
+    else:
+        raise ValueError(f"Unknown notification channel {message.channel!r}")
+
 
+def _error_text(exc: Exception) -> str:
+    return f"{type(exc).__name__}: {exc}"
 
+
+def _attempt(message: OutboxMessage):
+    try:
+        deliver(message)
+    except Exception as exc:
+        return _error_text(exc)
+    return None
+
+
+def _send_emails(indexed, errors) -> None:
+    try:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+    except Exception as exc:
+        for i, _ in indexed:
+            errors[i] = _error_text(exc)
+        return
+    from_email = _from_email()
+    try:
+        for i, message in indexed:
+            email = EmailMessage(message.subject, message.body, from_email, [message.recipient], connection=connection)
+            try:
+                if not connection.send_messages([email]):
+                    errors[i] = 'Email backend reported nothing sent'
+            except Exception as exc:
+                errors[i] = _error_text(exc)
+    finally:
+        connection.close()
+
+
+def deliver_many(messages, workers: int = 4) -> list:
+    """Send a batch of outbox messages and return one error (or None) per message.
+
+    Emails share a single SMTP connection; everything else goes out on a thread
+    pool of at most ``workers`` concurrent requests while the emails are sent.
+    """
+    messages = list(messages)
+    errors = [None] * len(messages)
+    emails = [(i, m) for i, m in enumerate(messages) if m.channel == 'email']
+    others = [(i, m) for i, m in enumerate(messages) if m.channel != 'email']
+    with timed_notifications(), ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [(i, pool.submit(_attempt, m)) for i, m in others]
+        if emails:
+            _send_emails(emails, errors)
+        for i, future in futures:
+            errors[i] = future.result()
+    return errors
@@ -0,0 +1,92 @@
+"""Cached schedule of the special offers running right now.
+
+The schedule is loaded with one query and cached until the next offer starts or
+ends; SpecialOffer writes drop it early (see signals.py).
+"""
+import bisect
+import math
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import SpecialOffer
+
+OFFER_SCHEDULE_CACHE_KEY = 'rose_cakes:offer_schedule'
+
+
+class OfferSchedule:
+    """The special offers valid between two schedule boundaries.
+
+    Built from the active offers that have not ended yet. It stays correct until
+    ``expires_at``: the next moment an offer starts or ends.
+    """
+
+    def __init__(self, offers, now):
+        self.offers = [o for o in offers if o.valid_from <= now <= o.valid_until]
+        boundaries = [o.valid_from for o in offers if o.valid_from > now]
+        # valid_until is inclusive, so the offer drops out just after it
+        boundaries += [o.valid_until + timedelta(microseconds=1) for o in self.offers]
+        self.expires_at = min(boundaries) if boundaries else None
+
+        # Offers by minimum order value, with the best percentage and best fixed
+        # amount available at or below each threshold
+        ranked = sorted(self.offers, key=lambda o: (o.minimum_order_value, o.pk))
+        self._thresholds = [o.minimum_order_value for o in ranked]
+        self._best_percentage = []
+        self._best_amount = []
+        best_pct = best_amt = None
+        for offer in ranked:
+            if offer.discount_percentage > 0:
+                if best_pct is None or offer.discount_percentage > best_pct.discount_percentage:
+                    best_pct = offer
+            elif offer.discount_amount > 0:
+                if best_amt is None or offer.discount_amount > best_amt.discount_amount:
+                    best_amt = offer
+            self._best_percentage.append(best_pct)
+            self._best_amount.append(best_amt)
+
+    def is_current(self, now) -> bool:
+        return self.expires_at is None or now < self.expires_at
+
+    def best_offer(self, order_total):
+        """Return (offer, discount) for the largest discount ``order_total`` qualifies for.
+
+        Mirrors SpecialOffer.get_discount_amount without re-reading the clock.
+        Returns (None, 0) when no offer applies.
+        """
+        if order_total <= 0:
+            return None, 0
+        eligible = bisect.bisect_right(self._thresholds, order_total)
+        if not eligible:
+            return None, 0
+        best, discount = None, 0
+        pct_offer = self._best_percentage[eligible - 1]
+        if pct_offer is not None:
+            best, discount = pct_offer, order_total * (pct_offer.discount_percentage / 100)
+        amt_offer = self._best_amount[eligible - 1]
+        if amt_offer is not None:
+            amount = min(amt_offer.discount_amount, order_total)
+            if amount > discount:
+                best, discount = amt_offer, amount
+        return best, discount
+
+
+def get_offer_schedule() -> OfferSchedule:
+    """Return the offer schedule for now, loading it with one query when the cached one has expired."""
+    now = timezone.now()
+    schedule = cache.get(OFFER_SCHEDULE_CACHE_KEY)
+    if schedule is not None and schedule.is_current(now):
+        return schedule
+
+    offers = list(SpecialOffer.objects.filter(active=True, valid_until__gte=now).order_by('pk'))
+    schedule = OfferSchedule(offers, now)
+    timeout = None
+    if schedule.expires_at is not None:
+        timeout = max(1, math.ceil((schedule.expires_at - now).total_seconds()))
+    cache.set(OFFER_SCHEDULE_CACHE_KEY, schedule, timeout)
+    return schedule
+
+
+def invalidate_offer_schedule() -> None:
+    cache.delete(OFFER_SCHEDULE_CACHE_KEY)
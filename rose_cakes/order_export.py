@@ -0,0 +1,125 @@
+"""Streaming order exports for accounting, as CSV or JSON Lines.
+
+Orders are read with ``iterator(chunk_size=...)``, each chunk with its items
+prefetched, and encoded line by line, so the first bytes go out straight away
+and memory stays flat however many orders match.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import OrderItem
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+ORDER_COLUMNS = (
+    'order_id', 'created_at', 'status', 'customer_name', 'customer_email', 'whatsapp_number', 'pickup_date',
+    'username', 'coupon_code', 'special_offer', 'items_total', 'coupon_discount', 'offer_discount',
+    'discount_amount', 'total_amount',
+)
+ITEM_COLUMNS = ('item_id', 'cake_id', 'cake_name', 'quantity', 'unit_price', 'line_total')
+# Free text typed by customers or staff
+TEXT_COLUMNS = {'customer_name', 'customer_email', 'username', 'coupon_code', 'special_offer', 'cake_name'}
+
+
+def export_chunk_size() -> int:
+    return getattr(settings, 'ORDER_EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_queryset(queryset):
+    """``queryset`` with what an export row needs joined or prefetched."""
+    items = OrderItem.objects.select_related('cake').only(
+        'id', 'order_id', 'quantity', 'price', 'cake_id', 'cake__name',
+    ).order_by('id')
+    return queryset.select_related('user', 'coupon', 'special_offer').prefetch_related(
+        Prefetch('items', queryset=items),
+    )
+
+
+def _order_record(order) -> dict:
+    return {
+        'order_id': order.id,
+        'created_at': timezone.localtime(order.created_at).isoformat(),
+        'status': order.status,
+        'customer_name': order.customer_name,
+        'customer_email': order.customer_email,
+        'whatsapp_number': order.whatsapp_number or '',
+        'pickup_date': order.pickup_date.isoformat(),
+        'username': order.user.username if order.user else '',
+        'coupon_code': order.coupon.code if order.coupon else '',
+        'special_offer': order.special_offer.title if order.special_offer else '',
+        'items_total': order.items_total,
+        'coupon_discount': order.coupon_discount,
+        'offer_discount': order.discount_amount - order.coupon_discount,
+        'discount_amount': order.discount_amount,
+        'total_amount': order.total_amount,
+    }
+
+
+def _item_record(item) -> dict:
+    return {
+        'item_id': item.id,
+        'cake_id': item.cake_id,
+        'cake_name': item.cake.name,
+        'quantity': item.quantity,
+        'unit_price': item.price,
+        'line_total': item.price * item.quantity,
+    }
+
+
+def export_orders(queryset, chunk_size=None):
+    """Yield ``(order record, [item records])`` for every order in ``queryset``, in its order."""
+    for order in export_queryset(queryset).iterator(chunk_size=chunk_size or export_chunk_size()):
+        yield _order_record(order), [_item_record(item) for item in order.items.all()]
+
+
+class _Echo:
+    """File-like object whose write returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(column, value):
+    # Keep spreadsheet apps from evaluating typed-in text as a formula
+    if column in TEXT_COLUMNS and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value
+    return value
+
+
+def csv_lines(orders):
+    """One CSV line per order item; orders without items get one line with blank item columns."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(ORDER_COLUMNS + ITEM_COLUMNS)
+    blank = dict.fromkeys(ITEM_COLUMNS, '')
+    for order, items in orders:
+        row = [_cell(column, order[column]) for column in ORDER_COLUMNS]
+        for item in items or [blank]:
+            yield writer.writerow(row + [_cell(column, item[column]) for column in ITEM_COLUMNS])
+
+
+def jsonl_lines(orders):
+    """One JSON object per order, its items nested under ``items``."""
+    for order, items in orders:
+        yield json.dumps({**order, 'items': items}, cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(queryset, format, chunk_size=None):
+    lines = csv_lines if format == 'csv' else jsonl_lines
+    return lines(export_orders(queryset, chunk_size))
+
+
+def export_response(queryset, format) -> StreamingHttpResponse:
+    """Stream ``queryset``'s orders as a file download in ``format`` ('csv' or 'jsonl')."""
+    response = StreamingHttpResponse(export_lines(queryset, format), content_type=EXPORT_FORMATS[format])
+    filename = f"orders-{timezone.localtime():%Y%m%d-%H%M%S}.{format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,144 @@
+import time
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import get_site_settings
+from .coupons import CouponUnavailable, redeem
+from .models import Order, OrderItem
+from .notifications import notify_admin_new_order, notify_users_order_status
+from .rollups import ROLLUP_FIELDS, apply as apply_rollups, contributions
+
+
+def attach_items(order: Order, items) -> None:
+    """Attach ``items`` as ``order.items.all()`` and give each a ``subtotal``.
+
+    Prefetched querysets hand back these same instances, so templates can call
+    ``order.items.all`` repeatedly without extra queries or losing ``subtotal``.
+    """
+    items = list(items)
+    for item in items:
+        item.subtotal = item.price * item.quantity
+    if not hasattr(order, '_prefetched_objects_cache'):
+        order._prefetched_objects_cache = {}
+    order._prefetched_objects_cache['items'] = items
+
+
+def snapshot_lines(priced) -> list:
+    """The ``Order.line_snapshot`` entries for a priced cart."""
+    return [
+        {
+            'cake_id': line.cake.id,
+            'name': line.cake.name,
+            'weight': line.cake.weight,
+            'unit_price': line.cake.price,
+            'quantity': line.quantity,
+            'subtotal': line.subtotal,
+            'image': line.cake.image.name or '',
+        }
+        for line in priced.lines
+    ]
+
+
+def place_order(priced, *, customer_name, customer_email, whatsapp_number, pickup_date,
+                user=None, coupon=None, special_offer=None, discount_amount=0, coupon_discount=0) -> Order:
+    """Write an order and its line items for a priced cart in one transaction.
+
+    Prices are snapshotted from the ``PricedCart`` (one read done by the caller),
+    so the transaction holds only the write lock: the coupon redemption if a
+    coupon is used, one INSERT for the order, one bulk INSERT for the items, and
+    the admin alert rows in the notification outbox. ``coupon_discount`` is the
+    coupon's share of ``discount_amount``. The returned order has its items
+    attached. Raises CouponUnavailable, writing nothing, when the coupon has no
+    use left.
+    """
+    order = Order(
+        customer_name=customer_name,
+        customer_email=customer_email,
+        whatsapp_number=whatsapp_number,
+        pickup_date=pickup_date,
+        total_amount=priced.total - discount_amount,
+        user=user,
+        coupon=coupon,
+        special_offer=special_offer,
+        discount_amount=discount_amount,
+        coupon_discount=coupon_discount,
+        line_snapshot=snapshot_lines(priced),
+        item_count=priced.total_items,
+        items_total=priced.total,
+        status='pending' # Await admin acceptance
+    )
+    items = [
+        OrderItem(cake=line.cake, quantity=line.quantity, price=line.cake.price)
+        for line in priced.lines
+    ]
+
+    # Warm the settings cache so the outbox write below does no read under the lock
+    get_site_settings()
+    with transaction.atomic():
+        if coupon is not None and not redeem(coupon):
+            raise CouponUnavailable(coupon.code)
+        order.save(force_insert=True)
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+        notify_admin_new_order(order)
+
+    attach_items(order, items)
+    return order
+
+
+# Primary keys per status UPDATE; SQLite builds before 3.32 allow only 999 parameters
+STATUS_UPDATE_BATCH_SIZE = 500
+
+
+@dataclass(frozen=True)
+class StatusTransition:
+    changed: int
+    queued: list
+    update_seconds: float
+    queue_seconds: float
+
+
+def bulk_transition_status(queryset, new_status) -> StatusTransition:
+    """Move every order in ``queryset`` to ``new_status`` with conditional UPDATEs by primary key.
+
+    The keys go in batches of STATUS_UPDATE_BATCH_SIZE, so a "select all"
+    stays within the database's limit on query parameters; a usual selection
+    is one UPDATE. Orders already in that status are left alone. The sales
+    rollups and the customer notifications for the changed orders are written
+    in the same transaction, the notifications with a single INSERT.
+    """
+    with transaction.atomic():
+        started = time.perf_counter()
+        orders = list(
+            queryset.exclude(status=new_status).order_by().select_related(None).only(
+                'id', 'customer_name', 'customer_email', 'whatsapp_number', 'pickup_date', *ROLLUP_FIELDS,
+            )
+        )
+        now = timezone.now()
+        pks = [order.pk for order in orders]
+        changed = 0
+        for start in range(0, len(pks), STATUS_UPDATE_BATCH_SIZE):
+            changed += Order.objects.filter(pk__in=pks[start:start + STATUS_UPDATE_BATCH_SIZE]).exclude(
+                status=new_status,
+            ).update(status=new_status, updated_at=now)
+        # The UPDATE skips signals: move the orders between status rollups here
+        rollup_rows = []
+        for order in orders:
+            rollup_rows += contributions(order, sign=-1)
+            order.status = new_status
+            order.updated_at = now
+            rollup_rows += contributions(order)
+        apply_rollups(rollup_rows)
+        updated_at = time.perf_counter()
+        queued = notify_users_order_status(orders)
+        queued_at = time.perf_counter()
+
+    return StatusTransition(
+        changed=changed,
+        queued=queued,
+        update_seconds=updated_at - started,
+        queue_seconds=queued_at - updated_at,
+    )
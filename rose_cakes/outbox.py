@@ -0,0 +1,111 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .notifications import deliver_many
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _due_filter(now):
+    # Pending rows whose backoff has elapsed, plus rows a crashed worker left claimed
+    stale_claim = now - timedelta(seconds=_setting('NOTIFICATION_CLAIM_TIMEOUT', 300))
+    return (
+        Q(status='pending', next_attempt_at__lte=now)
+        | Q(status='sending', claimed_at__lt=stale_claim)
+    )
+
+
+def claim_due(batch_size: int) -> list:
+    """Mark up to ``batch_size`` due messages as sending for this caller and return them.
+
+    The conditional UPDATE makes the claim safe when several workers poll at once.
+    """
+    now = timezone.now()
+    ids = list(
+        OutboxMessage.objects.filter(_due_filter(now))
+        .order_by('next_attempt_at', 'id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    return claim(ids, _due_filter(now), now)
+
+
+def claim(ids, condition=None, now=None) -> list:
+    """Claim the given pending messages (or those matching ``condition``) for this caller."""
+    if not ids:
+        return []
+    now = now or timezone.now()
+    token = uuid.uuid4().hex
+    OutboxMessage.objects.filter(condition if condition is not None else Q(status='pending'), pk__in=ids).update(
+        status='sending', claimed_by=token, claimed_at=now,
+    )
+    return list(OutboxMessage.objects.filter(claimed_by=token, status='sending').order_by('id'))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    base = _setting('NOTIFICATION_RETRY_BASE_SECONDS', 30)
+    cap = _setting('NOTIFICATION_RETRY_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+def record_results(messages, errors) -> tuple:
+    """Store the outcome of one delivery attempt per message; returns (sent, retrying, failed)."""
+    now = timezone.now()
+    max_attempts = _setting('NOTIFICATION_MAX_ATTEMPTS', 5)
+    sent_ids = [m.id for m, error in zip(messages, errors) if error is None]
+    if sent_ids:
+        OutboxMessage.objects.filter(pk__in=sent_ids).update(
+            status='sent', sent_at=now, attempts=F('attempts') + 1, last_error='', claimed_by='',
+        )
+
+    retrying = failed = 0
+    for message, error in zip(messages, errors):
+        if error is None:
+            continue
+        message.attempts += 1
+        message.last_error = error
+        message.claimed_by = ''
+        if message.attempts >= max_attempts:
+            message.status = 'failed'
+            failed += 1
+        else:
+            message.status = 'pending'
+            message.next_attempt_at = now + retry_delay(message.attempts)
+            retrying += 1
+        message.save(update_fields=['attempts', 'last_error', 'claimed_by', 'status', 'next_attempt_at'])
+    return len(sent_ids), retrying, failed
+
+
+def process_batch(messages, workers: int) -> tuple:
+    """Deliver claimed messages and record the results.
+
+    Emails reuse one SMTP connection and WhatsApp calls run on up to ``workers``
+    threads; those threads only do network I/O, all database writes happen on
+    the caller's thread.
+    """
+    if not messages:
+        return 0, 0, 0
+    errors = deliver_many(messages, workers)
+    return record_results(messages, errors)
+
+
+def send_now(messages, workers: int = 4) -> tuple:
+    """Deliver freshly queued messages immediately; anything that fails stays queued for the worker."""
+    return process_batch(claim([m.pk for m in messages]), workers)
+
+
+def drain(batch_size: int = 50, workers: int = 4) -> tuple:
+    """Process due messages until none are left; returns totals of (sent, retrying, failed)."""
+    totals = [0, 0, 0]
+    while True:
+        messages = claim_due(batch_size)
+        if not messages:
+            return tuple(totals)
+        for i, count in enumerate(process_batch(messages, workers)):
+            totals[i] += count
@@ -0,0 +1,226 @@
+import base64
+import json
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+# Everything a cake card renders; the category comes along in the same query
+CARD_FIELDS = ('id', 'name', 'description', 'price', 'image', 'weight', 'category__name')
+
+
+def page_size() -> int:
+    return getattr(settings, 'CATALOG_PAGE_SIZE', 24)
+
+
+def order_page_size() -> int:
+    return getattr(settings, 'ORDER_HISTORY_PAGE_SIZE', 20)
+
+
+def card_queryset(queryset):
+    return queryset.select_related('category').only(*CARD_FIELDS)
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the decoded cursor values, or None for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    return values
+
+
+@dataclass(frozen=True)
+class Page:
+    items: list
+    next_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _valid_cursor(after) -> bool:
+    types = (int, str, int, str, int)
+    return (isinstance(after, list) and len(after) == len(types)
+            and all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(after, types))
+            and after[0] in (0, 1))
+
+
+def _keyset_after(cursor):
+    after = decode_cursor(cursor)
+    return after if _valid_cursor(after) else None
+
+
+def _uncategorized_after(queryset, after):
+    uncategorized = queryset.filter(category__isnull=True).order_by('name', 'id')
+    if after is not None:
+        _, _, _, name, pk = after
+        uncategorized = uncategorized.filter(Q(name__gt=name) | Q(name=name, id__gt=pk))
+    return uncategorized
+
+
+def _categorized_after(queryset, after):
+    categorized = queryset.filter(category__isnull=False).order_by('category__name', 'category_id', 'name', 'id')
+    if after is not None and after[0] == 1:
+        _, category_name, category_id, name, pk = after
+        categorized = categorized.filter(
+            Q(category__name__gt=category_name)
+            | Q(category__name=category_name, category_id__gt=category_id)
+            | Q(category_id=category_id, name__gt=name)
+            | Q(category_id=category_id, name=name, id__gt=pk)
+        )
+    return categorized
+
+
+def _keyset_result(items, size) -> Page:
+    if len(items) <= size:
+        return Page(items)
+    items = items[:size]
+    last = items[-1]
+    if last.category_id is None:
+        return Page(items, encode_cursor([0, '', 0, last.name, last.id]))
+    return Page(items, encode_cursor([1, last.category.name, last.category_id, last.name, last.id]))
+
+
+def keyset_page(queryset, cursor=None, size=None) -> Page:
+    """One page of cakes ordered by (category name, category id, name, id), starting after ``cursor``.
+
+    Cakes without a category come first. The two groups are read by separate
+    queries, because SQLite can only return the category-ordered join from
+    the (category, name, id) index, with no sort, as an inner join. Each query
+    is a range read of at most one page. A page costs one query, or two when
+    it straddles the uncategorized group.
+    """
+    size = size or page_size()
+    after = _keyset_after(cursor)
+    items = []
+    if after is None or after[0] == 0:
+        items = list(_uncategorized_after(queryset, after)[:size + 1])
+    if len(items) <= size:
+        items += list(_categorized_after(queryset, after)[:size + 1 - len(items)])
+    return _keyset_result(items, size)
+
+
+async def akeyset_page(queryset, cursor=None, size=None) -> Page:
+    """``keyset_page`` for async views."""
+    size = size or page_size()
+    after = _keyset_after(cursor)
+    items = []
+    if after is None or after[0] == 0:
+        items = [cake async for cake in _uncategorized_after(queryset, after)[:size + 1]]
+    if len(items) <= size:
+        items += [cake async for cake in _categorized_after(queryset, after)[:size + 1 - len(items)]]
+    return _keyset_result(items, size)
+
+
+def _ranked_offset(cursor) -> int:
+    offset = decode_cursor(cursor)
+    return offset if isinstance(offset, int) and offset >= 0 else 0
+
+
+def ranked_fetch_limit(cursor=None, size=None) -> int:
+    """How many ranked ids ``ranked_page`` needs for the page at ``cursor``: up to its end, plus one to tell if there is a next."""
+    return _ranked_offset(cursor) + (size or page_size()) + 1
+
+
+def _ranked_ids(ids, cursor, size):
+    size = size or page_size()
+    offset = _ranked_offset(cursor)
+    next_offset = offset + size
+    return ids[offset:next_offset], encode_cursor(next_offset) if next_offset < len(ids) else None
+
+
+def ranked_page(ids, queryset, cursor=None, size=None) -> Page:
+    """One page of an already-ranked id list (e.g. search hits); the cursor is the rank offset."""
+    page_ids, next_cursor = _ranked_ids(ids, cursor, size)
+    by_id = queryset.in_bulk(page_ids)
+    return Page([by_id[pk] for pk in page_ids if pk in by_id], next_cursor)
+
+
+async def aranked_page(ids, queryset, cursor=None, size=None) -> Page:
+    """``ranked_page`` for async views."""
+    page_ids, next_cursor = _ranked_ids(ids, cursor, size)
+    by_id = await queryset.ain_bulk(page_ids)
+    return Page([by_id[pk] for pk in page_ids if pk in by_id], next_cursor)
+
+
+def newest_first_page(queryset, cursor=None, size=None) -> Page:
+    """One page of rows ordered by (created_at, id) descending, starting after ``cursor``."""
+    size = size or order_page_size()
+    queryset = queryset.order_by('-created_at', '-id')
+    after = decode_cursor(cursor)
+    if isinstance(after, list) and len(after) == 2 and isinstance(after[0], str) and isinstance(after[1], int):
+        created_at = parse_datetime(after[0])
+        if created_at is not None:
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=after[1]))
+
+    items = list(queryset[:size + 1])
+    if len(items) <= size:
+        return Page(items)
+    items = items[:size]
+    last = items[-1]
+    return Page(items, encode_cursor([last.created_at.isoformat(), last.id]))
+
+
+def estimated_row_count(model, using='default'):
+    """The planner's row estimate for ``model``'s table, or None when the database has none.
+
+    Read from pg_class on PostgreSQL, information_schema on MySQL and from the
+    ``ANALYZE`` statistics (sqlite_stat1) on SQLite, so it is as fresh as the
+    last analyze.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [connection.ops.quote_name(table)]),
+        'mysql': ('SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s', [table]),
+        'sqlite': ('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]),
+    }
+    if connection.vendor not in queries:
+        return None
+    sql, params = queries[connection.vendor]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # Only there once ANALYZE has run
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    # sqlite_stat1.stat is "rows [rows per key ...]"
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Admin paginator that never counts a huge table.
+
+    An unfiltered changelist shows the planner's row estimate once it reaches
+    ADMIN_ESTIMATED_COUNT_MIN rows. Any other count stops at ADMIN_COUNT_LIMIT,
+    so filtered lists page through at most that many rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= getattr(settings, 'ADMIN_ESTIMATED_COUNT_MIN', 100_000):
+                return estimate
+        limit = getattr(settings, 'ADMIN_COUNT_LIMIT', 10_000)
+        return queryset.order_by()[:limit].count()
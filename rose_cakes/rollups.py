@@ -0,0 +1,204 @@
+"""Daily sales rollups behind the store-admin dashboard.
+
+Every order adds to the DailySales row for its day and status, and to the
+DailyCakeSales row of each cake in it unless it is cancelled. Order writes
+apply their change to the rollups in the same transaction (signals.py, and
+orders.bulk_transition_status for its UPDATE), so the dashboard reads a few
+small rows instead of aggregating the orders.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import DailyCakeSales, DailySales, Order
+
+# Order fields an order's contribution to the rollups is computed from
+ROLLUP_FIELDS = (
+    'created_at', 'status', 'total_amount', 'items_total', 'discount_amount', 'coupon_discount', 'line_snapshot',
+)
+
+# Keys per UPDATE; each one adds a WHEN branch per counter
+APPLY_BATCH_SIZE = 100
+
+
+def order_day(order):
+    """The store-time-zone date an order counts towards."""
+    return timezone.localdate(order.created_at)
+
+
+def contributions(order, sign=1) -> list:
+    """The ``(model, keys, deltas)`` rows ``order`` adds to the rollups; ``sign=-1`` takes them back out."""
+    day = order_day(order)
+    coupon_discount = Decimal(order.coupon_discount)
+    rows = [(DailySales, {'day': day, 'status': order.status}, {
+        'orders': sign,
+        'revenue': sign * Decimal(order.total_amount),
+        'items_total': sign * Decimal(order.items_total),
+        'coupon_discount': sign * coupon_discount,
+        'offer_discount': sign * (Decimal(order.discount_amount) - coupon_discount),
+    })]
+    if order.status != 'cancelled':
+        rows += [
+            (DailyCakeSales, {'day': day, 'cake_id': line['cake_id']}, {
+                'units': sign * line['quantity'],
+                'revenue': sign * Decimal(str(line['subtotal'])),
+            })
+            for line in order.line_snapshot
+        ]
+    return rows
+
+
+def _merge(rows, totals=None) -> dict:
+    """Sum row deltas into {model: {keys: {field: total}}}, keys as sorted item tuples."""
+    totals = totals if totals is not None else defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    for model, keys, deltas in rows:
+        counters = totals[model][tuple(sorted(keys.items()))]
+        for name, delta in deltas.items():
+            counters[name] += delta
+    return totals
+
+
+def apply(rows) -> None:
+    """Add ``rows`` to the stored counters.
+
+    Each table gets one INSERT for missing rows and one UPDATE adding every
+    delta in place, so concurrent writers never overwrite each other's counts.
+    """
+    for model, entries in _merge(rows).items():
+        entries = [(dict(keys), counters) for keys, counters in entries.items() if any(counters.values())]
+        for start in range(0, len(entries), APPLY_BATCH_SIZE):
+            batch = entries[start:start + APPLY_BATCH_SIZE]
+            model.objects.bulk_create([model(**keys) for keys, _ in batch], ignore_conflicts=True)
+            match = Q()
+            for keys, _ in batch:
+                match |= Q(**keys)
+            names = {name for _, counters in batch for name in counters}
+            model.objects.filter(match).update(**{
+                name: F(name) + Case(
+                    *[When(Q(**keys), then=Value(counters[name])) for keys, counters in batch if counters[name]],
+                    default=Value(0),
+                    output_field=model._meta.get_field(name),
+                )
+                for name in names
+            })
+
+
+def rebuild(since=None) -> int:
+    """Recompute the rollups from the orders for days from ``since`` on (every day by default).
+
+    Returns the number of rollup rows written.
+    """
+    orders = Order.objects.only(*ROLLUP_FIELDS).order_by('pk')
+    if since is not None:
+        orders = orders.filter(created_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+    totals = None
+    for order in orders.iterator(chunk_size=2000):
+        totals = _merge(contributions(order), totals)
+
+    written = 0
+    with transaction.atomic():
+        for model in (DailySales, DailyCakeSales):
+            stale = model.objects.all() if since is None else model.objects.filter(day__gte=since)
+            stale.delete()
+            entries = (totals or {}).get(model, {})
+            model.objects.bulk_create(
+                [model(**dict(keys), **counters) for keys, counters in entries.items()], batch_size=500,
+            )
+            written += len(entries)
+    return written
+
+
+@dataclass
+class PeriodSales:
+    """Dashboard figures for the ``days`` days up to today, and the same span before them."""
+    label: str
+    days: int
+    orders: int = 0
+    revenue: Decimal = Decimal('0')
+    coupon_discount: Decimal = Decimal('0')
+    offer_discount: Decimal = Decimal('0')
+    cancelled: int = 0
+    previous_orders: int = 0
+    previous_revenue: Decimal = Decimal('0')
+    statuses: dict = field(default_factory=dict)
+
+    @property
+    def average_order(self):
+        return self.revenue / self.orders if self.orders else Decimal('0')
+
+    @staticmethod
+    def _change(current, previous):
+        # Percent change, or None when there is nothing to compare with
+        return round((current - previous) * 100 / previous) if previous else None
+
+    @property
+    def orders_trend(self):
+        return self._change(self.orders, self.previous_orders)
+
+    @property
+    def revenue_trend(self):
+        return self._change(self.revenue, self.previous_revenue)
+
+
+@dataclass
+class SalesSummary:
+    periods: list
+    daily: list
+    top_cakes: list
+
+
+DASHBOARD_PERIODS = (('Today', 1), ('Last 7 days', 7), ('Last 30 days', 30))
+
+
+def sales_summary(today=None) -> SalesSummary:
+    """Today, 7-day and 30-day figures with trends, read from the rollups in two queries."""
+    today = today or timezone.localdate()
+    longest = max(days for _, days in DASHBOARD_PERIODS)
+    periods = [PeriodSales(label, days) for label, days in DASHBOARD_PERIODS]
+    labels = dict(Order.STATUS_CHOICES)
+    daily = {today - timedelta(days=n): [0, Decimal('0')] for n in reversed(range(longest))}
+
+    rows = DailySales.objects.filter(day__gt=today - timedelta(days=2 * longest), day__lte=today).values_list(
+        'day', 'status', 'orders', 'revenue', 'coupon_discount', 'offer_discount',
+    )
+    for day, status, orders, revenue, coupon_discount, offer_discount in rows:
+        age = (today - day).days
+        label = labels.get(status, status)
+        if status != 'cancelled' and day in daily:
+            daily[day][0] += orders
+            daily[day][1] += revenue
+        for period in periods:
+            if age < period.days:
+                period.statuses[label] = period.statuses.get(label, 0) + orders
+                if status == 'cancelled':
+                    period.cancelled += orders
+                    continue
+                period.orders += orders
+                period.revenue += revenue
+                period.coupon_discount += coupon_discount
+                period.offer_discount += offer_discount
+            elif age < 2 * period.days and status != 'cancelled':
+                period.previous_orders += orders
+                period.previous_revenue += revenue
+
+    busiest = max((revenue for _, revenue in daily.values()), default=0) or 1
+    top_cakes = list(
+        DailyCakeSales.objects.filter(day__gt=today - timedelta(days=longest), day__lte=today)
+        .values('cake_id', 'cake__name')
+        .annotate(units=Sum('units'), revenue=Sum('revenue'))
+        .filter(units__gt=0)
+        .order_by('-units', 'cake__name')[:5]
+    )
+    return SalesSummary(
+        periods=periods,
+        daily=[
+            {'day': day, 'orders': orders, 'revenue': revenue, 'percent': round(revenue * 100 / busiest)}
+            for day, (orders, revenue) in daily.items()
+        ],
+        top_cakes=top_cakes,
+    )
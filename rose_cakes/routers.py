@@ -0,0 +1,72 @@
+"""Send the reads of read-only storefront pages to a read-only connection.
+
+Views decorated with ``read_only`` read from ``settings.READ_ONLY_DATABASE``
+(``'readonly'``), a second alias on the same SQLite file opened with
+``PRAGMA query_only``, so page views don't queue behind checkouts on the
+default connection. Writes always go to ``default``. Reads inside a
+transaction on ``default`` stay there so they see its uncommitted rows.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_reading = ContextVar('read_only_view', default=False)
+
+
+def read_only_alias() -> str:
+    return getattr(settings, 'READ_ONLY_DATABASE', 'readonly')
+
+
+def read_only(view):
+    """Serve GET and HEAD requests to ``view`` (sync or async) from the read-only alias."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+            # The async ORM's threads run in a copy of this context
+            token = _reading.set(True)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _reading.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        token = _reading.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _reading.reset(token)
+    return wrapper
+
+
+class ReadOnlyRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_only_alias()
+        if not _reading.get() or alias not in connections.settings:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Rows read from the read-only alias are saved to the default one
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        same_file = {DEFAULT_DB_ALIAS, read_only_alias()}
+        if obj1._state.db in same_file and obj2._state.db in same_file:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == read_only_alias():
+            return False
+        return None
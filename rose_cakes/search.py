@@ -0,0 +1,122 @@
+import re
+
+from asgiref.sync import sync_to_async
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Cake
+from .pagination import akeyset_page, aranked_page, card_queryset, keyset_page, ranked_fetch_limit, ranked_page
+
+FTS_TABLE = 'rose_cakes_cake_fts'
+
+# The triggers from migration 0010 that keep the index in step with the tables
+FTS_TRIGGERS = ('rose_cakes_cake_fts_ai', 'rose_cakes_cake_fts_ad', 'rose_cakes_cake_fts_au', 'rose_cakes_category_fts_au')
+
+# bm25 column weights: name, description, category_name
+BM25_WEIGHTS = (10.0, 1.0, 4.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# connection alias -> whether the FTS table exists
+_fts_available = {}
+
+
+def _read_connection():
+    # Where the ORM would read cakes from: the read-only alias inside read_only views
+    return connections[router.db_for_read(Cake)]
+
+
+def fts_available() -> bool:
+    """True when the FTS5 index from migration 0010 and its triggers exist on the database cakes are read from.
+
+    Without the triggers (see the migration) the index would go stale, so
+    searches use the LIKE fallback instead.
+    """
+    connection = _read_connection()
+    alias = connection.alias
+    if alias not in _fts_available:
+        available = False
+        if connection.vendor == 'sqlite':
+            names = (FTS_TABLE, *FTS_TRIGGERS)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})", names,
+                )
+                available = cursor.fetchone()[0] == len(names)
+        _fts_available[alias] = available
+    return _fts_available[alias]
+
+
+def match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query where every word must match as a prefix.
+
+    Each word is quoted, so FTS5 operators typed by the user are treated as text.
+    """
+    return ' '.join(f'"{token}"*' for token in _TOKEN_RE.findall(query.lower()))
+
+
+def ranked_cake_ids(query: str, category_id=None, limit=None) -> list:
+    """Ids of the first ``limit`` (default all) cakes matching ``query``, best BM25 score first.
+
+    Requires ``fts_available()``.
+    """
+    match = match_expression(query)
+    if not match:
+        return []
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    sql = f"SELECT {FTS_TABLE}.rowid FROM {FTS_TABLE}"
+    params = [match]
+    where = f"{FTS_TABLE} MATCH %s"
+    if category_id:
+        sql += f" JOIN rose_cakes_cake cake ON cake.id = {FTS_TABLE}.rowid"
+        where += " AND cake.category_id = %s"
+        params.append(category_id)
+    sql += f" WHERE {where} ORDER BY bm25({FTS_TABLE}, {weights}), {FTS_TABLE}.rowid"
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+    with _read_connection().cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def like_filter(query: str) -> Q:
+    """The LIKE-based match used when FTS5 is unavailable."""
+    return Q(name__icontains=query) | Q(description__icontains=query) | Q(category__name__icontains=query)
+
+
+def search_page(query: str, category_id=None, cursor=None, with_total=True):
+    """One page of search results plus the total hit count (None when ``with_total`` is off).
+
+    Ranked FTS hits page by rank; browsing without a query, or the LIKE
+    fallback, pages by (category name, name, id). Without the total, ranked
+    hits are only fetched up to the end of the page.
+    """
+    queryset = card_queryset(Cake.objects.all())
+    if query and fts_available():
+        ids = ranked_cake_ids(query, category_id, None if with_total else ranked_fetch_limit(cursor))
+        return ranked_page(ids, queryset, cursor), len(ids) if with_total else None
+
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+    if query:
+        queryset = queryset.filter(like_filter(query))
+    return keyset_page(queryset, cursor), queryset.count() if with_total else None
+
+
+async def asearch_page(query: str, category_id=None, cursor=None, with_total=True):
+    """``search_page`` for async views.
+
+    The FTS5 lookup is raw SQL, which has no async API, so it runs in a
+    thread; the cake rows and the count come from the async ORM.
+    """
+    queryset = card_queryset(Cake.objects.all())
+    if query and await sync_to_async(fts_available)():
+        ids = await sync_to_async(ranked_cake_ids)(query, category_id, None if with_total else ranked_fetch_limit(cursor))
+        return await aranked_page(ids, queryset, cursor), len(ids) if with_total else None
+
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+    if query:
+        queryset = queryset.filter(like_filter(query))
+    return await akeyset_page(queryset, cursor), await queryset.acount() if with_total else None
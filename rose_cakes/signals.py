@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caching import bump_catalog_version, invalidate_cake_card, invalidate_category_cards, invalidate_site_settings
+from .coupons import invalidate_coupon
+from .images import IMAGE_FIELDS, generate_derivatives
+from .models import Cake, Category, Coupon, Order, SiteSettings, SpecialOffer
+from .offers import invalidate_offer_schedule
+from .rollups import ROLLUP_FIELDS, apply as apply_rollups, contributions
+from .suggestions import invalidate_suggestion_index
+
+
+@receiver([post_save, post_delete], sender=SiteSettings)
+def site_settings_changed(sender, **kwargs):
+    # Drop it now for this process, and again after commit so no other worker
+    # can re-cache the pre-commit row in between.
+    invalidate_site_settings()
+    transaction.on_commit(invalidate_site_settings)
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver([post_save, post_delete], sender=Cake)
+@receiver([post_save, post_delete], sender=Category)
+def menu_changed(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_suggestion_index)
+    transaction.on_commit(bump_catalog_version)
+    # Only the edited cake's card, or the cards of the edited category's cakes
+    invalidate_cards = invalidate_cake_card if sender is Cake else invalidate_category_cards
+    pk = instance.pk  # cleared on the instance once a delete finishes
+    transaction.on_commit(lambda: invalidate_cards(pk))
+
+
+@receiver([post_save, post_delete], sender=Coupon)
+def coupon_changed(sender, instance, **kwargs):
+    # Drop the cached lookup now and again after commit, as for site settings
+    code = instance.code
+    invalidate_coupon(code)
+    transaction.on_commit(lambda: invalidate_coupon(code))
+
+
+@receiver([post_save, post_delete], sender=SpecialOffer)
+def offers_changed(sender, **kwargs):
+    invalidate_offer_schedule()
+    transaction.on_commit(invalidate_offer_schedule)
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Cake)
+@receiver(post_save, sender=SpecialOffer)
+@receiver(post_save, sender=SiteSettings)
+def images_saved(sender, instance, **kwargs):
+    # Derivatives already on disk are skipped, so re-saving an unchanged image is cheap
+    names = [
+        getattr(instance, field).name
+        for label, field in IMAGE_FIELDS
+        if label == sender._meta.label and getattr(instance, field)
+    ]
+    if not names:
+        return
+    pk = instance.pk
+
+    def generate():
+        written = sum(generate_derivatives(name) for name in names)
+        if written:
+            # Pages and cards may have been cached before the srcset existed
+            bump_catalog_version()
+            if sender is Cake:
+                invalidate_cake_card(pk)
+
+    transaction.on_commit(generate)
+
+
+def _touches_rollups(update_fields):
+    return update_fields is None or not set(update_fields).isdisjoint(ROLLUP_FIELDS)
+
+
+@receiver(pre_save, sender=Order)
+def order_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Remember what the stored row contributed, to swap it for the new values
+    instance._rollup_before = None
+    if raw or instance._state.adding or not _touches_rollups(update_fields):
+        return
+    instance._rollup_before = sender.objects.filter(pk=instance.pk).only(*ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Same transaction as the order write, so the rollups never disagree with a committed order
+    if raw or not (created or _touches_rollups(update_fields)):
+        return
+    rows = contributions(instance)
+    before = getattr(instance, '_rollup_before', None)
+    if before is not None:
+        rows += contributions(before, sign=-1)
+    apply_rollups(rows)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    apply_rollups(contributions(instance, sign=-1))
@@ -0,0 +1,287 @@
+"""Per-process typeahead index for cake names.
+
+Built lazily from one query and kept in memory, so ``search_suggestions`` answers
+without touching the database. Cake/Category writes bump a version in the shared
+cache and every process rebuilds its copy on its next lookup.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import takewhile
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = 'rose_cakes:suggestion_index_version'
+
+# Trie nodes hold every entry below them, so depth is capped to bound memory;
+# longer queries filter the deepest node's entries instead.
+MAX_TRIE_DEPTH = 6
+FUZZY_MIN_SIMILARITY = 0.3
+# Upper bound on entries scored per fuzzy lookup, to keep typeahead latency flat
+FUZZY_MAX_CANDIDATES = 200
+
+
+@lru_cache(maxsize=65536)
+def _trigrams(word: str) -> frozenset:
+    padded = f'  {word} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class _Node:
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        self.entries = []
+
+
+def _insert(root: _Node, key: str, idx: int) -> None:
+    node = root
+    for char in key[:MAX_TRIE_DEPTH]:
+        child = node.children.get(char)
+        if child is None:
+            child = node.children[char] = _Node()
+        node = child
+        # Entries are inserted in name order, so each list stays sorted
+        if not node.entries or node.entries[-1] != idx:
+            node.entries.append(idx)
+
+
+def _walk(root: _Node, key: str):
+    node = root
+    for char in key[:MAX_TRIE_DEPTH]:
+        node = node.children.get(char)
+        if node is None:
+            return None
+    return node
+
+
+class _Partition:
+    """Index over one set of cakes: the whole menu, or one category."""
+
+    def __init__(self, rows):
+        # rows: (id, name, category_name) sorted by lower-cased name
+        self.ids = [row[0] for row in rows]
+        self.names = [row[1] for row in rows]
+        self.lowers = [row[1].lower() for row in rows]
+        self.name_trie = _Node()
+        self.word_trie = _Node()
+        # trigram -> entries whose name contains it
+        self.postings = defaultdict(list)
+        # Typo matching runs against distinct words, not entries
+        self.word_entries = defaultdict(list)
+        self.entry_words = []
+        categories = defaultdict(list)
+
+        for idx, lower in enumerate(self.lowers):
+            _insert(self.name_trie, lower, idx)
+            words = lower.split()
+            for word in words[1:]:
+                _insert(self.word_trie, word, idx)
+            grams = set()
+            for word in words:
+                grams |= _trigrams(word)
+                if not self.word_entries[word] or self.word_entries[word][-1] != idx:
+                    self.word_entries[word].append(idx)
+            for gram in grams:
+                self.postings[gram].append(idx)
+            self.entry_words.append(frozenset(words))
+            if rows[idx][2]:
+                categories[rows[idx][2].lower()].append(idx)
+
+        self.categories = sorted(categories.items())
+        # Entry -> its position by (word count, name), for breaking score ties
+        self.tie_rank = [0] * len(self.entry_words)
+        by_size = sorted(range(len(self.entry_words)), key=lambda idx: len(self.entry_words[idx]))
+        for rank, idx in enumerate(by_size):
+            self.tie_rank[idx] = rank
+        self.vocabulary = list(self.word_entries)
+        self.vocabulary_grams = [len(_trigrams(word)) for word in self.vocabulary]
+        self.vocabulary_postings = defaultdict(list)
+        for word_id, word in enumerate(self.vocabulary):
+            for gram in _trigrams(word):
+                self.vocabulary_postings[gram].append(word_id)
+
+    def _prefixed(self, trie, q, test):
+        node = _walk(trie, q)
+        if node is None:
+            return
+        if len(q) <= MAX_TRIE_DEPTH:
+            yield from node.entries
+        else:
+            for idx in node.entries:
+                if test(self.lowers[idx]):
+                    yield idx
+
+    def _substring(self, q):
+        words = [w for w in q.split() if len(w) >= 3]
+        if not words:
+            return
+        grams = {w[i:i + 3] for w in words for i in range(len(w) - 2)}
+        rarest = min((self.postings.get(g, ()) for g in grams), key=len)
+        for idx in rarest:
+            if q in self.lowers[idx]:
+                yield idx
+
+    def _category(self, q):
+        for name, entries in self.categories:
+            if name.startswith(q) or f' {q}' in f' {name}':
+                yield from entries
+
+    def _similar_words(self, word):
+        grams = _trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.vocabulary_postings.get(gram, ()))
+        similar = {}
+        for word_id, common in shared.items():
+            similarity = common / (len(grams) + self.vocabulary_grams[word_id] - common)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                similar[self.vocabulary[word_id]] = similarity
+        return similar
+
+    def _fuzzy(self, q):
+        # Score each entry by how well its words cover the (possibly misspelt) query words
+        per_word = [self._similar_words(word) for word in q.split()]
+        per_word = [similar for similar in per_word if similar]
+        if not per_word:
+            return
+        # An entry's score sums, per query word, its most similar word. The
+        # entries of each similar word are spread with dict updates, least
+        # similar first so the best one wins
+        bests = []
+        for similar in per_word:
+            best = {}
+            for word, similarity in sorted(similar.items(), key=itemgetter(1)):
+                best.update(dict.fromkeys(self.word_entries[word], similarity))
+            bests.append(best)
+        # Prefer entries that match every query word
+        candidates = set(bests[0]).intersection(*bests[1:]) or set().union(*bests)
+        if len(bests) == 1:
+            scores = bests[0]
+        else:
+            scores = {idx: sum(best.get(idx, 0) for best in bests) for idx in candidates}
+        # Capped on the score, not the position, so the best matches are kept.
+        # Two stable sorts with C-level keys: ties go to shorter names, then name order
+        ranked = sorted(candidates, key=self.tie_rank.__getitem__)
+        ranked.sort(key=scores.__getitem__, reverse=True)
+        yield from ranked[:FUZZY_MAX_CANDIDATES]
+
+    def lookup(self, q: str, limit: int) -> list:
+        found = []
+        seen = set()
+
+        def take(kind, candidates):
+            for idx in candidates:
+                if idx not in seen:
+                    seen.add(idx)
+                    found.append((self.ids[idx], self.names[idx], kind))
+                    if len(found) >= limit:
+                        return True
+            return False
+
+        # An exact name sorts first among the names it prefixes
+        exact = takewhile(lambda idx: self.lowers[idx] == q, self._prefixed(self.name_trie, q, lambda s: s.startswith(q)))
+        tiers = (
+            ('exact', exact),
+            ('prefix', self._prefixed(self.name_trie, q, lambda s: s.startswith(q))),
+            ('prefix', self._prefixed(self.word_trie, q, lambda s: f' {q}' in s)),
+            ('substring', self._substring(q)),
+            ('category', self._category(q)),
+        )
+        for kind, candidates in tiers:
+            if take(kind, candidates):
+                return found
+        # Typo tolerance only when nothing matched literally
+        if not found:
+            take('fuzzy', self._fuzzy(q))
+        return found
+
+
+class SuggestionIndex:
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda row: (row[1].lower(), row[0]))
+        self.all = _Partition([(r[0], r[1], r[3]) for r in rows])
+        by_category = defaultdict(list)
+        for row in rows:
+            if row[2] is not None:
+                by_category[row[2]].append((row[0], row[1], row[3]))
+        self.by_category = {cid: _Partition(part) for cid, part in by_category.items()}
+        self.size = len(rows)
+
+    @classmethod
+    def build(cls):
+        from .models import Cake
+        return cls(Cake.objects.values_list('id', 'name', 'category_id', 'category__name'))
+
+    def lookup(self, q: str, category_id=None, limit: int = 5) -> list:
+        """Return up to ``limit`` (id, name, kind) matches, best first.
+
+        ``kind`` is one of exact, prefix, substring, category or fuzzy.
+        """
+        q = ' '.join(q.lower().split())
+        if not q:
+            return []
+        if category_id:
+            try:
+                partition = self.by_category.get(int(category_id))
+            except (TypeError, ValueError):
+                return []
+            if partition is None:
+                return []
+        else:
+            partition = self.all
+        return partition.lookup(q, limit)
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def _current_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        # Entry evicted or never set: start a new generation so stale copies rebuild
+        cache.add(VERSION_CACHE_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+def get_suggestion_index() -> SuggestionIndex:
+    """Return this process's index, building it on first use or after a menu edit.
+
+    One request rebuilds a stale index while concurrent requests keep using the
+    previous copy instead of queueing behind the lock.
+    """
+    global _index, _index_version
+    version = _current_version()
+    index = _index
+    if index is not None and _index_version == version:
+        return index
+    if index is not None and not _lock.acquire(blocking=False):
+        return index
+    if index is None:
+        _lock.acquire()
+    try:
+        if _index is None or _index_version != version:
+            _index = SuggestionIndex.build()
+            _index_version = version
+        return _index
+    finally:
+        _lock.release()
+
+
+async def aget_suggestion_index() -> SuggestionIndex:
+    """``get_suggestion_index`` for async views; only a (re)build leaves the event loop."""
+    index = _index
+    if index is not None and _index_version == _current_version():
+        return index
+    return await sync_to_async(get_suggestion_index)()
+
+
+def invalidate_suggestion_index() -> None:
+    cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
@@ -0,0 +1,11 @@
+from django import template
+
+from ..caching import annotate_card_versions
+
+register = template.Library()
+
+
+@register.filter
+def with_card_versions(cakes):
+    """Loop over cakes with ``card_version`` set, for the cake card fragment cache."""
+    return annotate_card_versions(cakes)
@@ -0,0 +1,40 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..images import DERIVATIVE_FORMATS, available_derivatives, derivative_name
+
+register = template.Library()
+
+# Matches the col-xl-3 col-lg-4 col-md-6 card grid
+CARD_SIZES = '(min-width: 1200px) 25vw, (min-width: 992px) 33vw, (min-width: 768px) 50vw, 100vw'
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes=CARD_SIZES, **attrs):
+    """Render ``image`` as a lazy-loaded <picture> offering its WebP and JPEG derivatives.
+
+    Falls back to a plain <img> of the original until derivatives exist.
+    Extra keyword arguments (class, style, ...) become <img> attributes.
+    """
+    if not image:
+        return ''
+    storage = image.storage
+    widths = available_derivatives(image.name, storage)
+    attributes = format_html_join('', ' {}="{}"', ((key.replace('_', '-'), value) for key, value in attrs.items()))
+    sources = []
+    srcsets = {}
+    for extension, _, mime_type in DERIVATIVE_FORMATS:
+        if widths[extension]:
+            srcsets[extension] = ', '.join(
+                f'{storage.url(derivative_name(image.name, w, extension))} {w}w' for w in widths[extension]
+            )
+            if extension != 'jpg':
+                sources.append(format_html('<source type="{}" srcset="{}" sizes="{}">', mime_type, srcsets[extension], sizes))
+    if 'jpg' in srcsets:
+        img = format_html('<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy" decoding="async"{}>',
+                          image.url, srcsets['jpg'], sizes, alt, attributes)
+    else:
+        img = format_html('<img src="{}" alt="{}" loading="lazy" decoding="async"{}>', image.url, alt, attributes)
+    if not sources:
+        return img
+    return format_html('<picture>{}{}</picture>', format_html_join('', '{}', ((s,) for s in sources)), img)
@@ -1,3 +1,1502 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.template import Context, Template, base as template_base, engines
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .caching import annotate_card_versions, get_site_settings, invalidate_site_settings
+from .benchmark import CaseResult, SeedSizes, compare, default_cases, run_case, seed, uncovered_url_names
+from .cart import price_cart
+from .cart_store import CART_CACHE_PREFIX, CacheCartStore, SignedCookieCartStore, cookie_name, decode_cart, encode_cart
+from .coupons import find_coupon, invalidate_coupon, redeem
+from .images import derivative_name, generate_derivatives
+from .models import (
+    Cake, Category, Coupon, DailyCakeSales, DailySales, Order, OrderItem, OutboxMessage, SiteSettings, SpecialOffer,
+)
+from .offers import get_offer_schedule
+from .notifications import notify_admin_new_order, notify_user_order_status, notify_users_order_status
+from .orders import bulk_transition_status, place_order
+from .outbox import drain, send_now
+from .pagination import encode_cursor
+from .rollups import sales_summary
+from .search import FTS_TABLE, FTS_TRIGGERS, fts_available, ranked_cake_ids, search_page
+from .suggestions import FUZZY_MAX_CANDIDATES, SuggestionIndex, aget_suggestion_index, get_suggestion_index
+from .timing import TimedDjangoTemplates, timed_notifications
+
+
+def fill_cart(client, cakes, quantity=1):
+    store = SignedCookieCartStore(RequestFactory().get('/'))
+    store.replace({cake.id: quantity for cake in cakes})
+    response = HttpResponse()
+    store.save(response)
+    client.cookies[cookie_name()] = response.cookies[cookie_name()].value
+
+
+def cart_request(client):
+    request = RequestFactory().get('/')
+    request.COOKIES = {name: morsel.value for name, morsel in client.cookies.items() if morsel.value}
+    return request
+
+
+def cart_cookie(client):
+    return SignedCookieCartStore(cart_request(client)).load()
+
+
+class SiteSettingsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+
+    def test_cached_after_first_lookup(self):
+        SiteSettings.objects.create(site_name='Rose Cakes')
+        invalidate_site_settings()
+        with self.assertNumQueries(1):
+            get_site_settings()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_site_settings().site_name, 'Rose Cakes')
+
+    def test_missing_row_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_site_settings())
+            self.assertIsNone(get_site_settings())
+
+    def test_save_and_delete_invalidate(self):
+        site = SiteSettings.objects.create(site_name='Rose Cakes')
+        self.assertEqual(get_site_settings().site_name, 'Rose Cakes')
+        site.site_name = 'Rose Bakery'
+        site.save()
+        self.assertEqual(get_site_settings().site_name, 'Rose Bakery')
+        site.delete()
+        self.assertIsNone(get_site_settings())
+
+    def test_pages_share_one_lookup(self):
+        SiteSettings.objects.create(site_name='Rose Bakery')
+        invalidate_site_settings()
+        response = self.client.get(reverse('homepage'))
+        self.assertContains(response, 'Rose Bakery')
+        with self.assertNumQueries(1):
+            # featured cakes only; offers come from the schedule cache
+            self.client.get(reverse('homepage'))
+
+
+class OfferScheduleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+
+    def offer(self, title, start=-1, end=1, **kwargs):
+        kwargs.setdefault('discount_percentage', Decimal('0'))
+        return SpecialOffer.objects.create(
+            title=title, description='-',
+            valid_from=self.now + timedelta(days=start), valid_until=self.now + timedelta(days=end), **kwargs,
+        )
+
+    def test_best_offer_matches_per_offer_scan(self):
+        offers = [
+            self.offer('Ten off 500', discount_percentage=Decimal('10'), minimum_order_value=Decimal('500')),
+            self.offer('Flat 80', discount_amount=Decimal('80'), minimum_order_value=Decimal('300')),
+            self.offer('Five off', discount_percentage=Decimal('5')),
+            self.offer('Twenty off 2000', discount_percentage=Decimal('20'), minimum_order_value=Decimal('2000')),
+            self.offer('Paused', discount_percentage=Decimal('50'), active=False),
+            self.offer('Upcoming', start=1, end=2, discount_percentage=Decimal('50')),
+        ]
+        schedule = get_offer_schedule()
+        for total in ['0', '100', '299.99', '300', '900', '1999', '2000', '10000']:
+            total = Decimal(total)
+            expected = max((o.get_discount_amount(total) for o in offers), default=0)
+            offer, discount = schedule.best_offer(total)
+            self.assertEqual(discount, expected, total)
+            if expected:
+                self.assertEqual(offer.get_discount_amount(total), expected)
+
+    def test_cached_until_next_boundary(self):
+        self.offer('Now', discount_percentage=Decimal('5'))
+        upcoming = self.offer('Later', start=1, end=2, discount_percentage=Decimal('10'))
+        with self.assertNumQueries(1):
+            schedule = get_offer_schedule()
+            self.assertEqual(get_offer_schedule().offers, schedule.offers)
+        self.assertEqual(schedule.expires_at, upcoming.valid_from)
+        self.assertEqual([o.title for o in schedule.offers], ['Now'])
+
+        with mock.patch('rose_cakes.offers.timezone.now', return_value=upcoming.valid_from):
+            self.assertEqual([o.title for o in get_offer_schedule().offers], ['Now', 'Later'])
+
+    def test_save_invalidates(self):
+        offer = self.offer('Now', discount_percentage=Decimal('5'))
+        self.assertEqual(len(get_offer_schedule().offers), 1)
+        offer.active = False
+        offer.save()
+        self.assertEqual(get_offer_schedule().offers, [])
+
+    def test_checkout_applies_best_offer(self):
+        self.offer('Flat 80', discount_amount=Decimal('80'), minimum_order_value=Decimal('300'))
+        cake = Cake.objects.create(name='Plum', description='-', price=Decimal('400.00'))
+        fill_cart(self.client, [cake])
+        response = self.client.get(reverse('checkout'))
+        self.assertEqual(response.context['special_offer_discount'], Decimal('80'))
+        self.assertEqual(response.context['applied_offer'].title, 'Flat 80')
+
+
+class CartPricingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.cakes = [
+            Cake.objects.create(name=f'Cake {i}', description='Rich', price=Decimal('100.00') + i)
+            for i in range(10)
+        ]
+
+    def test_price_cart_resolves_lines_in_one_query(self):
+        cart = {str(cake.id): 2 for cake in self.cakes}
+        cart['999999'] = 1
+        with self.assertNumQueries(1):
+            priced = price_cart(cart)
+        self.assertEqual(len(priced), 10)
+        self.assertEqual(priced.total_items, 20)
+        self.assertEqual(priced.total, sum((c.price * 2 for c in self.cakes), Decimal('0')))
+        self.assertEqual(priced.stale_keys, ('999999',))
+        self.assertEqual([line.cake for line in priced], self.cakes)
+
+    def test_cart_query_count_does_not_grow_with_cart(self):
+        self._fill_cart(self.cakes[:1])
+        self.client.get(reverse('cart'))
+        with self.assertNumQueries(1):
+            # one cake lookup; the cart comes from the cookie
+            self.client.get(reverse('cart'))
+        self._fill_cart(self.cakes)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('cart'))
+        self.assertEqual(response.context['total_items'], 10)
+
+    def test_stale_cake_is_dropped_instead_of_404(self):
+        self._fill_cart(self.cakes[:2])
+        self.cakes[0].delete()
+        response = self.client.get(reverse('cart'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cart_cookie(self.client), {self.cakes[1].id: 1})
+
+    def test_ajax_add_to_cart_reports_totals(self):
+        self._fill_cart(self.cakes[:3])
+        response = self.client.post(
+            reverse('add_to_cart', args=[self.cakes[0].id]),
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.json()['total_items'], 4)
+
+    def _fill_cart(self, cakes):
+        fill_cart(self.client, cakes)
+
+
+class CartStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.cakes = [
+            Cake.objects.create(name=f'Cake {i}', description='Rich', price=Decimal('100.00'))
+            for i in range(3)
+        ]
+
+    def test_encoding_round_trips_and_drops_junk(self):
+        items = {12: 2, 3: 1, 450: 7}
+        self.assertEqual(encode_cart(items), '12_2.3_1.450_7')
+        self.assertEqual(decode_cart(encode_cart(items)), items)
+        self.assertEqual(decode_cart('12_2.x_1.3_0._.5'), {12: 2})
+
+    def add(self, cake):
+        return self.client.post(reverse('add_to_cart', args=[cake.id]), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def assert_no_session_writes(self, ctx):
+        writes = [q['sql'] for q in ctx.captured_queries
+                  if 'django_session' in q['sql'] and not q['sql'].startswith('SELECT')]
+        self.assertEqual(writes, [])
+
+    def test_cookie_store_keeps_the_cart_out_of_the_session(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.add(self.cakes[0])
+            self.add(self.cakes[0])
+            self.add(self.cakes[1])
+            self.client.get(reverse('remove_from_cart', args=[self.cakes[0].id]))
+        self.assert_no_session_writes(ctx)
+        self.assertEqual(cart_cookie(self.client), {self.cakes[0].id: 1, self.cakes[1].id: 1})
+        self.assertNotIn('sessionid', self.client.cookies)
+
+        self.client.post(reverse('buy_now', args=[self.cakes[2].id]))
+        self.assertEqual(cart_cookie(self.client), {self.cakes[2].id: 1})
+
+    def test_tampered_cookie_is_ignored(self):
+        self.client.cookies[cookie_name()] = encode_cart({self.cakes[0].id: 5})
+        response = self.client.get(reverse('cart'))
+        self.assertEqual(response.context['total_items'], 0)
+
+    @override_settings(CART_STORE='rose_cakes.cart_store.CacheCartStore')
+    def test_cache_store_keeps_only_an_id_in_the_cookie(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.add(self.cakes[0])
+            response = self.add(self.cakes[1])
+        self.assert_no_session_writes(ctx)
+        self.assertEqual(response.json()['total_items'], 2)
+        cart_id = CacheCartStore(cart_request(self.client)).cart_id
+        self.assertEqual(cache.get(f'{CART_CACHE_PREFIX}:{cart_id}'),
+                         encode_cart({self.cakes[0].id: 1, self.cakes[1].id: 1}))
+        self.assertEqual(self.client.get(reverse('cart')).context['total_items'], 2)
+
+        other = self.client_class()
+        self.assertEqual(other.get(reverse('cart')).context['total_items'], 0)
+
+    def test_session_cart_from_before_the_store_is_carried_over(self):
+        session = self.client.session
+        session['cart'] = {str(self.cakes[0].id): 2}
+        session.save()
+        response = self.client.get(reverse('cart'))
+        self.assertEqual(response.context['total_items'], 2)
+        self.assertEqual(cart_cookie(self.client), {self.cakes[0].id: 2})
+        self.assertNotIn('cart', self.client.session)
+
+
+class OrderPlacementTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.cakes = [
+            Cake.objects.create(name=f'Cake {i}', description='Rich', price=Decimal('250.00'))
+            for i in range(5)
+        ]
+
+    def test_items_are_written_in_one_insert(self):
+        priced = price_cart({str(cake.id): 2 for cake in self.cakes})
+        with CaptureQueriesContext(connection) as ctx:
+            order = place_order(
+                priced,
+                customer_name='Asha',
+                customer_email='asha@example.com',
+                whatsapp_number='',
+                pickup_date=date(2026, 1, 1),
+            )
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        # order, items, sales and cake rollups, outbox
+        self.assertEqual(len(inserts), 5)
+        self.assertEqual(order.total_amount, Decimal('2500.00'))
+        with self.assertNumQueries(0):
+            self.assertEqual(sum(item.subtotal for item in order.items.all()), Decimal('2500.00'))
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 5)
+
+    def test_checkout_and_confirmation(self):
+        fill_cart(self.client, self.cakes)
+        response = self.client.post(reverse('checkout'), {
+            'name': 'Asha',
+            'email': 'asha@example.com',
+            'whatsapp_number': '',
+            'pickup_date': '2026-01-01',
+        })
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse('order_confirmation', args=[order.id]))
+        self.assertEqual(cart_cookie(self.client), {})
+        # the order row carries its own line snapshot
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('order_confirmation', args=[order.id]))
+        self.assertContains(response, '₹250.00', count=10)
+
+    def test_summary_keeps_the_order_as_placed(self):
+        priced = price_cart({cake.id: 2 for cake in self.cakes[:2]})
+        order = place_order(priced, customer_name='Asha', customer_email='asha@example.com',
+                            whatsapp_number='', pickup_date=date(2026, 1, 1))
+        self.assertEqual(order.item_count, 4)
+        self.assertEqual(order.items_total, Decimal('1000.00'))
+        Cake.objects.filter(pk=self.cakes[0].pk).update(name='Renamed', price=Decimal('999.00'))
+
+        order = Order.objects.get(pk=order.pk)
+        lines = order.lines
+        self.assertEqual([line['name'] for line in lines], [self.cakes[0].name, self.cakes[1].name])
+        self.assertEqual(lines[0]['unit_price'], Decimal('250.00'))
+        self.assertEqual(lines[0]['subtotal'], Decimal('500.00'))
+        self.assertEqual(lines[0]['quantity'], 2)
+        response = self.client.get(reverse('order_confirmation', args=[order.id]))
+        self.assertNotContains(response, 'Renamed')
+        self.assertContains(response, '₹1000.00')
+
+
+@override_settings(EMAIL_HOST_USER='owner@example.com', NOTIFICATION_RETRY_BASE_SECONDS=60, NOTIFICATION_MAX_ATTEMPTS=2)
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.order = Order.objects.create(
+            customer_name='Asha', customer_email='asha@example.com',
+            pickup_date=date(2026, 1, 1), total_amount=Decimal('500.00'),
+        )
+
+    def test_notifications_are_queued_not_sent(self):
+        notify_admin_new_order(self.order)
+        notify_user_order_status(self.order)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            sorted(OutboxMessage.objects.values_list('recipient', flat=True)),
+            ['asha@example.com', 'owner@example.com'],
+        )
+
+    def test_worker_delivers_due_messages(self):
+        notify_user_order_status(self.order)
+        call_command('send_notifications', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('sent', 1))
+
+    def test_failures_back_off_then_stay_failed(self):
+        notify_user_order_status(self.order)
+        with mock.patch('rose_cakes.outbox.deliver_many', return_value=['OSError: smtp down']):
+            self.assertEqual(drain(), (0, 1, 0))
+            message = OutboxMessage.objects.get()
+            self.assertEqual(message.status, 'pending')
+            self.assertIn('smtp down', message.last_error)
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+            # Not due yet, so nothing is claimed
+            self.assertEqual(drain(), (0, 0, 0))
+            OutboxMessage.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(drain(), (0, 0, 1))
+        self.assertEqual(OutboxMessage.objects.get().status, 'failed')
+
+    def test_retry_now_leaves_messages_being_sent_alone(self):
+        later = timezone.now() + timedelta(hours=1)
+        for status in ('pending', 'sending', 'sent', 'failed'):
+            OutboxMessage.objects.create(channel='email', recipient=f'{status}@example.com', body='-',
+                                         status=status, next_attempt_at=later, claimed_by='worker-1')
+        self.client.force_login(User.objects.create_superuser('boss', 'boss@example.com', 'pass12345'))
+        self.client.post(reverse('admin:rose_cakes_outboxmessage_changelist'), {
+            'action': 'retry_now', '_selected_action': list(OutboxMessage.objects.values_list('pk', flat=True)),
+        })
+        rows = {m.recipient.split('@')[0]: m for m in OutboxMessage.objects.all()}
+        self.assertEqual({name: m.status for name, m in rows.items()},
+                         {'pending': 'pending', 'sending': 'sending', 'sent': 'sent', 'failed': 'pending'})
+        self.assertEqual(rows['sending'].claimed_by, 'worker-1')
+        self.assertLess(rows['failed'].next_attempt_at, later)
+
+
+@override_settings(WHATSAPP_TOKEN='token', WHATSAPP_PHONE_ID='123')
+class BulkStatusTransitionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.admin_user = User.objects.create_superuser('boss', 'boss@example.com', 'pass12345')
+        self.client.force_login(self.admin_user)
+        Order.objects.bulk_create([
+            Order(
+                customer_name=f'Customer {i}', customer_email=f'c{i}@example.com',
+                whatsapp_number=f'+9190000000{i:02d}', pickup_date=date(2026, 1, 1),
+                total_amount=Decimal('100.00'), status='ready_for_pickup' if i < 5 else 'confirmed',
+            )
+            for i in range(30)
+        ])
+
+    def test_action_updates_once_and_sends_batch(self):
+        with mock.patch('rose_cakes.notifications._send_whatsapp') as whatsapp, \
+                CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('admin:rose_cakes_order_changelist'), {
+                'action': 'mark_ready_for_pickup',
+                '_selected_action': list(Order.objects.values_list('pk', flat=True)),
+            }, follow=True)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "rose_cakes_order"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Order.objects.filter(status='ready_for_pickup').count(), 30)
+        self.assertEqual(len(mail.outbox), 25)
+        self.assertEqual(whatsapp.call_count, 25)
+        self.assertEqual(OutboxMessage.objects.filter(status='sent').count(), 50)
+        self.assertContains(response, '25 order(s) marked as Ready for Pickup')
+        self.assertContains(response, '50 of 50 notification(s) sent')
+
+    def test_large_selection_is_updated_in_batches(self):
+        with mock.patch('rose_cakes.orders.STATUS_UPDATE_BATCH_SIZE', 8), \
+                mock.patch('rose_cakes.notifications._send_whatsapp'), \
+                CaptureQueriesContext(connection) as ctx:
+            result = bulk_transition_status(Order.objects.all(), 'ready_for_pickup')
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "rose_cakes_order"')]
+        self.assertEqual(len(updates), 4)
+        self.assertEqual(result.changed, 25)
+        self.assertEqual(Order.objects.filter(status='ready_for_pickup').count(), 30)
+
+    def test_emails_share_one_connection(self):
+        orders = list(Order.objects.all()[:3])
+        queued = notify_users_order_status(orders)
+        with mock.patch('rose_cakes.notifications.get_connection', wraps=get_connection) as get_conn, \
+                mock.patch('rose_cakes.notifications._send_whatsapp', side_effect=OSError('timeout')):
+            self.assertEqual(send_now(queued), (3, 3, 0))
+        get_conn.assert_called_once()
+
+
+def rollup_state():
+    return (
+        sorted(DailySales.objects.exclude(orders=0).values_list(
+            'day', 'status', 'orders', 'revenue', 'items_total', 'coupon_discount', 'offer_discount')),
+        sorted(DailyCakeSales.objects.exclude(units=0).values_list('day', 'cake_id', 'units', 'revenue')),
+    )
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.cakes = [Cake.objects.create(name=f'Cake {i}', description='-', price=Decimal('100.00')) for i in range(3)]
+        now = timezone.now()
+        self.coupon = Coupon.objects.create(code='SAVE', discount_percentage=Decimal('10'),
+                                            valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1))
+        self.orders = [
+            place_order(price_cart({cake.id: n + 1 for cake in self.cakes[:n + 1]}), customer_name='Asha',
+                        customer_email='asha@example.com', whatsapp_number='', pickup_date=date(2026, 1, 1))
+            for n in range(3)
+        ]
+        self.orders.append(place_order(
+            price_cart({self.cakes[0].id: 2}), customer_name='Ravi', customer_email='ravi@example.com',
+            whatsapp_number='', pickup_date=date(2026, 1, 1), coupon=self.coupon,
+            discount_amount=Decimal('30.00'), coupon_discount=Decimal('20.00'),
+        ))
+
+    def test_orders_are_rolled_up_as_they_are_placed(self):
+        today = timezone.localdate()
+        sales = DailySales.objects.get(day=today, status='pending')
+        self.assertEqual(sales.orders, 4)
+        self.assertEqual(sales.items_total, Decimal('1600.00'))
+        self.assertEqual(sales.revenue, Decimal('1570.00'))
+        self.assertEqual(sales.coupon_discount, Decimal('20.00'))
+        self.assertEqual(sales.offer_discount, Decimal('10.00'))
+        units = dict(DailyCakeSales.objects.filter(day=today).values_list('cake_id', 'units'))
+        self.assertEqual(units, {self.cakes[0].id: 8, self.cakes[1].id: 5, self.cakes[2].id: 3})
+
+    def test_status_changes_and_deletes_match_a_rebuild(self):
+        bulk_transition_status(Order.objects.filter(pk__in=[o.pk for o in self.orders[:2]]), 'cancelled')
+        bulk_transition_status(Order.objects.filter(pk=self.orders[0].pk), 'confirmed')
+        order = Order.objects.get(pk=self.orders[2].pk)
+        order.status = 'picked_up'
+        order.save()
+        Order.objects.get(pk=self.orders[3].pk).delete()
+        incremental = rollup_state()
+
+        self.assertEqual(DailySales.objects.get(status='cancelled').orders, 1)
+        self.assertEqual(DailyCakeSales.objects.get(cake=self.cakes[0]).units, 4)
+        out = StringIO()
+        call_command('rebuild_sales_rollups', stdout=out)
+        self.assertIn('rows written', out.getvalue())
+        self.assertEqual(rollup_state(), incremental)
+
+    def test_saves_that_leave_the_totals_alone_skip_the_rollups(self):
+        order = Order.objects.get(pk=self.orders[0].pk)
+        order.tracking_number = 'TRK1'
+        with CaptureQueriesContext(connection) as ctx:
+            order.save(update_fields=['tracking_number'])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        with CaptureQueriesContext(connection) as ctx:
+            order.save()
+        # previous row, then the order UPDATE; nothing changed in the rollups
+        self.assertEqual([q['sql'].split()[0] for q in ctx.captured_queries], ['SELECT', 'UPDATE'])
+
+    def test_summary_reads_only_the_rollups(self):
+        today = timezone.localdate()
+        DailySales.objects.create(day=today - timedelta(days=8), status='picked_up', orders=2, revenue=Decimal('400.00'))
+        with self.assertNumQueries(2):
+            summary = sales_summary(today)
+        today_sales, week, month = summary.periods
+        self.assertEqual((today_sales.orders, today_sales.revenue), (4, Decimal('1570.00')))
+        self.assertIsNone(today_sales.revenue_trend)
+        self.assertEqual(week.revenue_trend, 292)
+        self.assertEqual(month.orders, 6)
+        self.assertEqual(month.revenue, Decimal('1970.00'))
+        self.assertEqual(month.statuses, {'Pending': 4, 'Picked Up': 2})
+        self.assertEqual(summary.daily[-1]['percent'], 100)
+        self.assertEqual([cake['cake__name'] for cake in summary.top_cakes], ['Cake 0', 'Cake 1', 'Cake 2'])
+
+def search_cakes(query, category_id=None):
+    return search_page(query, category_id)[0].items
+
+
+class CakeSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.brownies = Category.objects.create(name='Brownies')
+        self.in_description = Cake.objects.create(name='Midnight Slice', description='Dense chocolate sponge', price=Decimal('300.00'))
+        self.in_name = Cake.objects.create(name='Chocolate Truffle', description='Ganache layers', price=Decimal('500.00'))
+        self.in_category = Cake.objects.create(name='Walnut Square', description='Chewy', price=Decimal('200.00'), category=self.brownies)
+
+    def test_index_is_available(self):
+        self.assertTrue(fts_available())
+
+    def test_triggers_survive_all_migrations(self):
+        # A SQLite table rebuild in a later migration drops them silently
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertLessEqual(set(FTS_TRIGGERS), triggers)
+
+    @override_settings(CATALOG_PAGE_SIZE=1)
+    def test_later_pages_fetch_ranked_ids_up_to_the_page(self):
+        Cake.objects.create(name='Chocolate Fudge', description='-', price=Decimal('100.00'))
+        with mock.patch('rose_cakes.search.ranked_cake_ids', wraps=ranked_cake_ids) as ranked:
+            page, total = search_page('choc', cursor=encode_cursor(1), with_total=False)
+        ranked.assert_called_once_with('choc', None, 3)
+        self.assertIsNone(total)
+        self.assertEqual(len(page.items), 1)
+        self.assertEqual(page.next_cursor, encode_cursor(2))
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(search_cakes('choc'), [self.in_name, self.in_description])
+
+    def test_index_follows_cake_and_category_writes(self):
+        self.assertEqual(search_cakes('brown'), [self.in_category])
+        self.brownies.name = 'Blondies'
+        self.brownies.save()
+        self.assertEqual(search_cakes('brown'), [])
+        self.assertEqual(search_cakes('blond'), [self.in_category])
+        self.in_name.delete()
+        self.assertEqual(search_cakes('truffle'), [])
+
+    def test_views_use_ranked_results(self):
+        response = self.client.get(reverse('search_results'), {'q': 'chocolate'})
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_like_fallback_without_fts(self):
+        with mock.patch('rose_cakes.search.fts_available', return_value=False):
+            self.assertEqual(search_cakes('chocolate'), [self.in_name, self.in_description])
+            self.assertEqual(search_cakes('brown'), [self.in_category])
+
+
+class SuggestionIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.brownies = Category.objects.create(name='Brownies')
+        self.cream = Category.objects.create(name='Cream Cakes')
+        names = [
+            ('Chocolate', self.cream), ('Chocolate Truffle', self.cream), ('Dark Chocolate Slab', self.brownies),
+            ('Red Velvet', self.cream), ('Walnut Square', self.brownies), ('Black Forest', None),
+        ]
+        self.cakes = {name: Cake.objects.create(name=name, description='-', price=Decimal('100.00'), category=category)
+                      for name, category in names}
+
+    def lookup(self, q, category_id=None):
+        return [(name, kind) for _, name, kind in get_suggestion_index().lookup(q, category_id)]
+
+    def test_tiers_are_ranked(self):
+        self.assertEqual(self.lookup('chocolate'), [
+            ('Chocolate', 'exact'), ('Chocolate Truffle', 'prefix'), ('Dark Chocolate Slab', 'prefix'),
+        ])
+        self.assertEqual(self.lookup('lnut'), [('Walnut Square', 'substring')])
+        self.assertEqual(self.lookup('brown'), [('Dark Chocolate Slab', 'category'), ('Walnut Square', 'category')])
+        self.assertEqual(self.lookup('red velvit')[0], ('Red Velvet', 'fuzzy'))
+        self.assertEqual(self.lookup('chocolate truffle cake')[0], ('Chocolate Truffle', 'fuzzy'))
+        self.assertEqual(self.lookup('xyz'), [])
+
+    def test_fuzzy_cap_keeps_the_best_matches(self):
+        # More weaker matches than the cap, all sorting before the right one
+        rows = [(i, f'A{i:03d} Velveteen', None, None) for i in range(FUZZY_MAX_CANDIDATES + 50)]
+        rows.append((1000, 'Red Velvet', None, None))
+        self.assertEqual(SuggestionIndex(rows).lookup('velvit')[0], (1000, 'Red Velvet', 'fuzzy'))
+
+    def test_category_partition(self):
+        self.assertEqual(self.lookup('choc', self.brownies.id), [('Dark Chocolate Slab', 'prefix')])
+        self.assertEqual(self.lookup('choc', 'nope'), [])
+
+    def test_suggestions_need_no_queries_and_follow_edits(self):
+        url = reverse('search_suggestions')
+        self.client.get(url, {'q': 'bla'})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'q': 'blak forest'})
+        self.assertEqual(response.json()['suggestions'][0]['name'], 'Black Forest')
+        with self.captureOnCommitCallbacks(execute=True):
+            Cake.objects.create(name='Blackcurrant Mousse', description='-', price=Decimal('100.00'))
+        response = self.client.get(url, {'q': 'blackc'})
+        self.assertEqual([s['name'] for s in response.json()['suggestions']], ['Blackcurrant Mousse'])
+
+
+class CakeCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.cream = Category.objects.create(name='Cream Cakes')
+        self.plum = Category.objects.create(name='Plum Cakes')
+        self.cakes = [
+            Cake.objects.create(name=f'Cake {i}', description='-', price=Decimal('100.00'),
+                                category=self.cream if i % 2 else self.plum)
+            for i in range(4)
+        ]
+
+    def versions(self):
+        return {cake.pk: cake.card_version for cake in annotate_card_versions(Cake.objects.all())}
+
+    def test_edits_bump_only_affected_cards(self):
+        before = self.versions()
+        self.assertEqual(self.versions(), before)
+
+        cake = self.cakes[0]
+        cake.price = Decimal('120.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            cake.save()
+        after = self.versions()
+        self.assertEqual([pk for pk in before if before[pk] != after[pk]], [cake.pk])
+
+        self.cream.name = 'Fresh Cream'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cream.save()
+        changed = self.versions()
+        self.assertEqual({pk for pk in after if after[pk] != changed[pk]},
+                         {c.pk for c in self.cakes if c.category_id == self.cream.pk})
+
+    def test_cached_cards_skip_rendering_and_follow_edits(self):
+        self.client.get(reverse('catalog'))
+        # A write that skips the signals shows the cards are served from the cache
+        Category.objects.filter(pk=self.cream.pk).update(name='Stale Cream')
+        response = self.client.get(reverse('catalog'))
+        self.assertContains(response, 'mb-2">Cream Cakes</span>', count=2)
+        self.assertNotContains(response, 'mb-2">Stale Cream</span>')
+        self.assertContains(response, 'class="add-to-cart-form"', count=len(self.cakes))
+
+        self.cream.name = 'Fresh Cream'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cream.save()
+        response = self.client.get(reverse('catalog'))
+        self.assertContains(response, 'mb-2">Fresh Cream</span>', count=2)
+        self.assertContains(response, 'mb-2">Plum Cakes</span>', count=2)
+
+    def test_cached_fragment_is_one_element_without_forms(self):
+        self.client.get(reverse('catalog'))
+        cake = annotate_card_versions([self.cakes[0]])[0]
+        fragment = cache.get(make_template_fragment_key('cake_card', [cake.id, cake.card_version])).strip()
+        self.assertTrue(fragment.startswith('<div') and fragment.endswith('</div>'))
+        self.assertEqual(fragment.count('<div'), fragment.count('</div>'))
+        self.assertNotIn('<form', fragment)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.cake = Cake.objects.create(name='Plum', description='-', price=Decimal('100.00'))
+
+    def test_matching_etag_is_answered_before_any_query(self):
+        for url in [reverse('catalog'), reverse('cake_detail', args=[self.cake.id]),
+                    reverse('search_suggestions') + '?q=plu', reverse('search_results') + '?q=plum']:
+            self.client.get(url)  # picks up the CSRF cookie pages set on first visit
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['ETag'].startswith('"'))
+            self.assertIn('Last-Modified', response)
+            self.assertIn('no-cache', response['Cache-Control'])
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304, url)
+
+    def test_menu_writes_change_the_etag(self):
+        url = reverse('search_results') + '?q=plum'
+        etag = self.client.get(url)['ETag']
+        self.cake.price = Decimal('120.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cake.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '120.00')
+
+    def test_pages_revalidate_per_visitor(self):
+        self.client.get(reverse('catalog'))
+        etag = self.client.get(reverse('catalog'))['ETag']
+        other = self.client_class()
+        other.get(reverse('catalog'))
+        response = other.get(reverse('catalog'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_DERIVATIVE_WIDTHS=(320, 640, 960))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, size=(800, 600)):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'pink').save(buffer, 'JPEG')
+        return SimpleUploadedFile('plum.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_upload_writes_narrower_derivatives(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cake = Cake.objects.create(name='Plum', description='-', price=Decimal('100.00'), image=self.upload())
+        for width, present in [(320, True), (640, True), (960, False)]:
+            for extension in ('webp', 'jpg'):
+                self.assertEqual(self.exists(derivative_name(cake.image.name, width, extension)), present)
+        with Image.open(os.path.join(self.media_root, derivative_name(cake.image.name, 320, 'webp'))) as image:
+            self.assertEqual(image.size, (320, 240))
+
+        html = Template('{% load responsive_images %}{% responsive_image cake.image alt=cake.name class="card-img-top" %}').render(
+            Context({'cake': cake}))
+        self.assertIn('<source type="image/webp" srcset="/media/cakes/plum.320w.webp 320w, /media/cakes/plum.640w.webp 640w"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('class="card-img-top"', html)
+
+        with mock.patch('django.core.files.storage.FileSystemStorage.exists') as exists:
+            html = Template('{% load responsive_images %}{% responsive_image cake.image %}').render(Context({'cake': cake}))
+        self.assertIn('srcset="/media/cakes/plum.320w.jpg 320w, /media/cakes/plum.640w.jpg 640w"', html)
+        exists.assert_not_called()
+
+    def test_narrow_original_is_not_decoded_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cake = Cake.objects.create(name='Plum', description='-', price=Decimal('100.00'), image=self.upload((300, 200)))
+        self.assertFalse(self.exists(derivative_name(cake.image.name, 320, 'jpg')))
+        with mock.patch('rose_cakes.images.ImageOps.exif_transpose') as transpose:
+            self.assertEqual(generate_derivatives(cake.image.name), 0)
+        transpose.assert_not_called()
+
+    def test_backfill_only_fills_gaps(self):
+        cake = Cake.objects.create(name='Plum', description='-', price=Decimal('100.00'), image=self.upload((1000, 500)))
+        out = StringIO()
+        call_command('generate_image_derivatives', workers=1, stdout=out)
+        self.assertIn('6 files written', out.getvalue())
+
+        os.remove(os.path.join(self.media_root, derivative_name(cake.image.name, 640, 'jpg')))
+        out = StringIO()
+        call_command('generate_image_derivatives', workers=1, stdout=out)
+        self.assertIn('1 files written', out.getvalue())
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        override = override_settings(MEDIA_ROOT=os.path.join(self.workdir, 'media'), IMAGE_DERIVATIVE_WIDTHS=(320,))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write(self, name, content):
+        path = os.path.join(self.workdir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def run_import(self, *args, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_catalog', *args, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_upserts_in_chunks(self):
+        existing = Cake.objects.create(name='Plum Cake', description='Old', price=Decimal('400.00'))
+        path = self.write('menu.csv', (
+            'name,description,price,weight,featured,category\n'
+            'Plum Cake,,450,,yes,Fruit Cakes\n'
+            'Black Forest,Cherries,600.5,1.5,no,Cream Cakes\n'
+            'Red Velvet,,550,,,Cream Cakes\n'
+            ',No name,100,,,\n'
+            'Truffle,,cheap,,,\n'
+        ))
+        out, err = self.run_import(path, chunk_size=2)
+        self.assertIn('chunk 3: 1 rows, 0 created, 0 updated, 1 skipped', out)
+        self.assertIn('5 rows', out)
+        self.assertIn('2 created, 1 updated, 2 skipped', out)
+        self.assertIn('line 5: name is required', err)
+        self.assertIn("line 6: price 'cheap' is not a number", err)
+
+        existing.refresh_from_db()
+        self.assertEqual((existing.price, existing.featured, existing.description), (Decimal('450.00'), True, 'Old'))
+        self.assertEqual(existing.category.name, 'Fruit Cakes')
+        self.assertEqual(Category.objects.count(), 2)
+        black_forest = Cake.objects.get(name='Black Forest')
+        self.assertEqual((black_forest.price, black_forest.weight), (Decimal('600.50'), Decimal('1.50')))
+        self.assertEqual(Cake.objects.get(name='Red Velvet').category, black_forest.category)
+
+        out, _ = self.run_import(path)
+        self.assertIn('0 created, 0 updated, 2 skipped', out)
+
+    def test_dry_run_writes_nothing(self):
+        path = self.write('menu.jsonl', '{"name": "Plum Cake", "price": "450", "category": "Fruit Cakes"}\n\n[1]\n')
+        out, err = self.run_import(path, dry_run=True)
+        self.assertIn('Dry run, nothing written: 2 rows', out)
+        self.assertIn('1 created, 0 updated, 1 skipped', out)
+        self.assertIn('line 3: not a JSON object', err)
+        self.assertFalse(Cake.objects.exists())
+        self.assertFalse(Category.objects.exists())
+
+    def test_images_are_copied_with_derivatives(self):
+        images = os.path.join(self.workdir, 'images')
+        os.mkdir(images)
+        Image.new('RGB', (800, 600), 'pink').save(os.path.join(images, 'plum.jpg'), 'JPEG')
+        cake = Cake.objects.create(name='Plum Cake', description='-', price=Decimal('450.00'))
+        path = self.write('menu.jsonl', (
+            f'{{"id": {cake.id}, "name": "Plum Cake", "price": 450, "image": "plum.jpg"}}\n'
+            '{"name": "Ghost", "price": 100, "image": "missing.jpg"}\n'
+        ))
+        out, err = self.run_import(path, images=images, workers=1)
+        self.assertIn('1 created, 1 updated, 0 skipped, 1 images', out)
+        self.assertIn("line 2: image 'missing.jpg' not found", err)
+        cake.refresh_from_db()
+        self.assertEqual(cake.image.name, 'cakes/plum.jpg')
+        self.assertTrue(os.path.exists(os.path.join(self.workdir, 'media', 'cakes', 'plum.320w.webp')))
+
+        # Same file again: reused rather than copied a second time
+        out, _ = self.run_import(path, images=images, workers=1)
+        self.assertIn('0 created, 0 updated', out)
+        self.assertEqual(os.listdir(os.path.join(self.workdir, 'media', 'cakes')).count('plum.jpg'), 1)
+
+@override_settings(CATALOG_PAGE_SIZE=4)
+class CatalogPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        cream = Category.objects.create(name='Cream Cakes')
+        plum = Category.objects.create(name='Plum Cakes')
+        for i in range(10):
+            Cake.objects.create(name=f'Cake {i:02d}', description='-', price=Decimal('100.00'),
+                                category=[cream, plum, None][i % 3])
+        self.expected = list(
+            Cake.objects.order_by(Coalesce('category__name', Value('')), 'category_id', 'name', 'id')
+            .values_list('name', flat=True)
+        )
+
+    def test_pages_walk_the_whole_menu_in_order(self):
+        response = self.client.get(reverse('catalog'))
+        names = [cake.name for cake in response.context['cakes']]
+        next_url = response.context['next_url']
+        while next_url:
+            with self.assertNumQueries(1):
+                # one range query within the categorized cakes, category joined
+                data = self.client.get(next_url).json()
+            names += re.findall(r'<h5 class="card-title">(.*?)</h5>', data['html'])
+            next_url = data['next_url']
+        self.assertEqual(names, self.expected)
+
+    def test_catalog_query_count_is_flat(self):
+        self.client.get(reverse('catalog'))
+        with self.assertNumQueries(3):
+            # uncategorized cakes, categorized cakes, categories
+            self.client.get(reverse('catalog'))
+
+    def test_bad_cursor_starts_from_the_top(self):
+        response = self.client.get(reverse('catalog'), {'after': 'not-a-cursor'})
+        self.assertEqual(len(response.context['cakes']), 4)
+
+    def test_search_results_count_once(self):
+        with self.assertNumQueries(2):
+            # ranked ids, page of cakes
+            data = self.client.get(reverse('search_results'), {'q': 'cake'}).json()
+        self.assertEqual(data['count'], 10)
+        self.assertTrue(data['next_url'])
+        response = self.client.get(reverse('search'), {'q': 'cake'})
+        self.assertContains(response, 'Search Results (10 found)')
+        self.assertContains(response, 'data-next-url=')
+
+
+@override_settings(ORDER_HISTORY_PAGE_SIZE=10)
+class OrderHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asha', password='pw')
+        cakes = [Cake.objects.create(name=f'Cake {i}', description='-', price=Decimal('100.00')) for i in range(3)]
+        priced = price_cart({cake.id: i + 1 for i, cake in enumerate(cakes)})
+        cls.orders = [
+            place_order(priced, customer_name='Asha', customer_email='asha@example.com', whatsapp_number='',
+                        pickup_date=date(2026, 1, 1), user=cls.user)
+            for _ in range(25)
+        ]
+        # Same timestamp for a run of orders: the id breaks the tie
+        Order.objects.filter(pk__in=[o.pk for o in cls.orders[5:15]]).update(created_at=cls.orders[5].created_at)
+        place_order(priced, customer_name='Other', customer_email='o@example.com', whatsapp_number='',
+                    pickup_date=date(2026, 1, 1))
+
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.client.force_login(self.user)
+
+    def test_pages_cover_history_newest_first_in_fixed_queries(self):
+        self.client.get(reverse('order_history'))
+        with self.assertNumQueries(3):
+            # session, user, orders with their line snapshots
+            response = self.client.get(reverse('order_history'))
+        seen = [order.id for order in response.context['orders']]
+        self.assertEqual(response.context['orders'][0].item_count, 6)
+        self.assertEqual(response.context['orders'][0].items_total, Decimal('600.00'))
+        self.assertContains(response, '₹600.00')
+        self.assertContains(response, '3 &times; Cake 2')
+
+        next_url = response.context['next_url']
+        while next_url:
+            with self.assertNumQueries(3):
+                data = self.client.get(next_url, HTTP_X_REQUESTED_WITH='XMLHttpRequest').json()
+            seen += [int(pk) for pk in re.findall(r'<strong>#(\d+)</strong>', data['html'])]
+            next_url = data['next_url']
+        expected = list(Order.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('boss', 'boss@example.com', 'pass12345')
+        cls.customer = User.objects.create_user('asha', 'asha@example.com', 'pw')
+        cakes = [Cake.objects.create(name=f'Cake {i}', description='-', price=Decimal('100.00')) for i in range(3)]
+        priced = price_cart({cake.id: 1 for cake in cakes})
+        for i in range(6):
+            place_order(priced, customer_name='Asha', customer_email='asha@example.com', whatsapp_number='',
+                        pickup_date=date(2026, 1, 1), user=cls.customer if i % 2 else None)
+
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.client.force_login(self.admin_user)
+
+    def test_user_filter_is_a_search_box(self):
+        changelist = reverse('admin:rose_cakes_order_changelist')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(changelist, {'user': 'asha@example.com', 'status__exact': 'pending'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertContains(response, 'name="user" value="asha@example.com"')
+        self.assertContains(response, '<input type="hidden" name="status__exact" value="pending">', html=True)
+        # No sidebar listing of users, and no full-table count next to the result count
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('SELECT "auth_user"')]), 1)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'] == 'SELECT COUNT(*) AS "__count" FROM "rose_cakes_order"'])
+
+    def test_item_rows_come_with_their_order_and_cake(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin:rose_cakes_orderitem_changelist'))
+        self.assertEqual(len(response.context['cl'].result_list), 18)
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('SELECT "rose_cakes_cake"')])
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('SELECT "rose_cakes_order"')])
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_MIN=0)
+    def test_unfiltered_count_is_the_planner_estimate(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Order.objects.filter(pk__in=Order.objects.values('pk')[:2]).delete()
+        changelist = reverse('admin:rose_cakes_order_changelist')
+        self.assertEqual(self.client.get(changelist).context['cl'].result_count, 6)
+        self.assertEqual(self.client.get(changelist, {'status__exact': 'pending'}).context['cl'].result_count, 4)
+
+    @override_settings(ADMIN_COUNT_LIMIT=4)
+    def test_filtered_counts_stop_at_the_limit(self):
+        response = self.client.get(reverse('admin:rose_cakes_order_changelist'), {'status__exact': 'pending'})
+        self.assertEqual(response.context['cl'].result_count, 4)
+
+class OrderExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('boss', 'boss@example.com', 'pass12345')
+        cakes = [Cake.objects.create(name=f'Cake {i}', description='-', price=Decimal('100.00')) for i in range(2)]
+        now = timezone.now()
+        coupon = Coupon.objects.create(code='SAVE10', discount_percentage=Decimal('10'),
+                                       valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1))
+        priced = price_cart({cakes[0].id: 2, cakes[1].id: 1})
+        cls.orders = [
+            place_order(priced, customer_name='=HYPERLINK("x")' if i == 0 else f'Customer {i}',
+                        customer_email='c@example.com', whatsapp_number='+919000000000',
+                        pickup_date=date(2026, 1, 1), coupon=coupon if i == 0 else None,
+                        discount_amount=Decimal('30.00') if i == 0 else 0,
+                        coupon_discount=Decimal('30.00') if i == 0 else 0)
+            for i in range(5)
+        ]
+        bulk_transition_status(Order.objects.filter(pk__in=[o.pk for o in cls.orders[3:]]), 'confirmed')
+
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.client.force_login(self.admin_user)
+
+    def rows(self, response):
+        self.assertTrue(response.streaming)
+        return list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+
+    @override_settings(ORDER_EXPORT_CHUNK_SIZE=2)
+    def test_export_link_follows_changelist_filters(self):
+        changelist = self.client.get(reverse('admin:rose_cakes_order_changelist'), {'status__exact': 'pending'})
+        export_url = reverse('admin:rose_cakes_order_export', args=['csv']) + '?status__exact=pending'
+        self.assertContains(changelist, export_url)
+        response = self.client.get(export_url)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="orders-', response['Content-Disposition'])
+        rows = self.rows(response)
+        # one line per item of the three pending orders
+        self.assertEqual(len(rows), 6)
+        self.assertEqual({row['status'] for row in rows}, {'pending'})
+        first = [row for row in rows if row['order_id'] == str(self.orders[0].id)]
+        self.assertEqual(first[0]['customer_name'], '\'=HYPERLINK("x")')
+        self.assertEqual(first[0]['whatsapp_number'], '+919000000000')
+        self.assertEqual((first[0]['coupon_code'], first[0]['coupon_discount'], first[0]['total_amount']),
+                         ('SAVE10', '30.00', '270.00'))
+        self.assertEqual([(row['cake_name'], row['quantity'], row['line_total']) for row in first],
+                         [('Cake 0', '2', '200.00'), ('Cake 1', '1', '100.00')])
+
+    def test_action_exports_the_selection_as_json_lines(self):
+        response = self.client.post(reverse('admin:rose_cakes_order_changelist'), {
+            'action': 'export_jsonl',
+            '_selected_action': [self.orders[1].pk, self.orders[4].pk],
+        })
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(sorted(line['order_id'] for line in lines), [self.orders[1].pk, self.orders[4].pk])
+        self.assertEqual([item['quantity'] for item in lines[0]['items']], [2, 1])
+
+    def test_command_streams_with_filters(self):
+        out = StringIO()
+        with self.assertNumQueries(2):
+            # orders with their user, coupon and offer; items with their cakes
+            call_command('export_orders', format='jsonl', status=['confirmed'], stdout=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line['order_id'] for line in lines], [o.pk for o in self.orders[3:]])
+        self.assertEqual(lines[0]['items_total'], '300.00')
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+
+    def test_seed_is_reproducible_and_spread_over_time(self):
+        out = StringIO()
+        call_command('seed_benchmark_data', categories=3, cakes=30, coupons=2, offers=2, users=5, orders=40,
+                     days=30, batch_size=16, stdout=out)
+        self.assertIn('Seeded 3 categories, 30 cakes, 2 coupons, 2 offers, 5 users, 40 orders.', out.getvalue())
+        self.assertEqual(OrderItem.objects.count(), sum(len(o.line_snapshot) for o in Order.objects.all()))
+        self.assertGreater(Order.objects.dates('created_at', 'day').count(), 5)
+        self.assertEqual(sum(DailySales.objects.values_list('orders', flat=True)), 40)
+        first = list(Cake.objects.order_by('id').values_list('name', 'price'))
+        with self.assertRaises(CommandError):
+            call_command('seed_benchmark_data', stdout=StringIO())
+
+        Cake.objects.all().delete()
+        call_command('seed_benchmark_data', categories=3, cakes=30, coupons=0, offers=0, users=0, orders=0,
+                     stdout=StringIO())
+        self.assertEqual(list(Cake.objects.order_by('id').values_list('name', 'price')), first)
+
+    def test_every_storefront_url_has_a_case(self):
+        seed(SeedSizes(categories=2, cakes=10, coupons=1, offers=1, users=2, orders=5))
+        self.assertEqual(uncovered_url_names(default_cases()), [])
+
+    def test_runner_reports_and_checks_the_baseline(self):
+        seed(SeedSizes(categories=2, cakes=10, coupons=1, offers=1, users=2, orders=5))
+        baseline_path = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(baseline_path))
+        out = StringIO()
+        call_command('run_benchmark', existing_data=True, repeat=2, warmup=1, save_baseline=baseline_path,
+                     only=['homepage', 'cart', 'checkout_submit', 'order_history'], stdout=out)
+        self.assertRegex(out.getvalue(), r'checkout_submit +[\d.]+ +[\d.]+ +[\d.]+ +\d+ +[\d.]+  302')
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        self.assertEqual(sorted(baseline), ['cart', 'checkout_submit', 'homepage', 'order_history'])
+        self.assertEqual(baseline['order_history']['statuses'], [200])
+
+        result = CaseResult(**baseline['cart'])
+        self.assertEqual(compare([result], baseline), [])
+        result.queries_per_request += 1
+        result.p95_ms = baseline['cart']['p95_ms'] * 2 + 5
+        result.statuses = [200, 500]
+        self.assertEqual(len(compare([result], baseline)), 3)
+
+class RequestTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        Cake.objects.create(name='Rose Velvet', description='Red', price=Decimal('500.00'))
+
+    def server_timing(self, response):
+        return dict(re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing']))
+
+    @override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=10_000)
+    def test_header_reports_queries_and_render(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('catalog'))
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', response['Server-Timing'])
+        timings = self.server_timing(response)
+        self.assertEqual(sorted(timings), ['db', 'notify', 'total', 'tpl'])
+        self.assertGreater(float(timings['tpl']), 0)
+        self.assertGreaterEqual(float(timings['total']), float(timings['tpl']))
+
+    @override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=0, SLOW_REQUEST_SQL_COUNT=2)
+    def test_slow_request_is_logged_with_view_and_sql(self):
+        with self.assertLogs('rose_cakes.slow_requests', 'WARNING') as logs:
+            self.client.get(reverse('cake_detail', args=[Cake.objects.get().pk]))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['event'], 'slow_request')
+        self.assertEqual(record['view'], 'cake_detail')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(len(record['slowest_sql']), 2)
+        self.assertGreaterEqual(record['slowest_sql'][0]['ms'], record['slowest_sql'][1]['ms'])
+
+    @override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=10_000)
+    def test_fast_request_is_not_logged(self):
+        with mock.patch('rose_cakes.timing.logger') as logger:
+            self.client.get(reverse('catalog'))
+        logger.warning.assert_not_called()
+
+    @override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=10_000, WHATSAPP_TOKEN='t', WHATSAPP_PHONE_ID='1')
+    def test_inline_notifications_are_timed(self):
+        admin = User.objects.create_user('asha', password='pw', is_staff=True, is_superuser=True)
+        order = place_order(price_cart({Cake.objects.get().pk: 1}), customer_name='Asha',
+                            customer_email='asha@example.com', whatsapp_number='+911234567890',
+                            pickup_date=date(2026, 1, 1), user=admin)
+        self.client.force_login(admin)
+        with mock.patch('rose_cakes.notifications._send_whatsapp', side_effect=lambda *args: time.sleep(0.05)):
+            response = self.client.post(reverse('admin:rose_cakes_order_changelist'), {
+                'action': 'mark_ready_for_pickup', '_selected_action': [order.pk],
+            })
+        self.assertGreaterEqual(float(self.server_timing(response)['notify']), 50)
+        with timed_notifications():
+            pass  # outside a request: nothing to add to
+
+    @override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=10_000)
+    async def test_async_views_report_their_queries(self):
+        # The async ORM runs queries in other threads, on their own connections
+        response = await self.async_client.get(reverse('search_results'), {'q': 'rose'})
+        self.assertEqual(response.json()['count'], 1)
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+        self.assertGreater(float(self.server_timing(response)['db']), 0)
+
+    @override_settings(REQUEST_TIMING=True, SLOW_REQUEST_MS=10_000)
+    def test_templates_are_timed_by_the_backend(self):
+        self.client.get(reverse('catalog'))
+        # Nothing is patched process-wide
+        self.assertEqual(template_base.Template.render.__module__, 'django.template.base')
+        self.assertIsInstance(engines['django'], TimedDjangoTemplates)
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('catalog')))
+
+
+class ReadOnlyRoutingTests(TransactionTestCase):
+    databases = {'default', 'readonly'}
+
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.cake = Cake.objects.create(name='Rose Velvet', description='Red', price=Decimal('500.00'))
+
+    def test_storefront_pages_read_from_the_read_only_alias(self):
+        with CaptureQueriesContext(connections['default']) as writer, \
+                CaptureQueriesContext(connections['readonly']) as reader:
+            self.assertContains(self.client.get(reverse('cake_detail', args=[self.cake.pk])), 'Rose Velvet')
+        self.assertTrue(reader.captured_queries)
+        self.assertEqual(writer.captured_queries, [])
+
+    def test_search_index_is_read_from_the_read_only_alias(self):
+        with CaptureQueriesContext(connections['default']) as writer, \
+                CaptureQueriesContext(connections['readonly']) as reader:
+            self.assertEqual(self.client.get(reverse('search_results'), {'q': 'rose'}).json()['count'], 1)
+        self.assertTrue(any(FTS_TABLE in q['sql'] for q in reader.captured_queries))
+        self.assertEqual(writer.captured_queries, [])
+
+    def test_benchmark_counts_queries_on_every_alias(self):
+        case = next(case for case in default_cases() if case.name == 'cake_detail')
+        result = run_case(case, repeat=2, warmup=0)
+        self.assertEqual(result.statuses, [200])
+        self.assertGreater(result.queries_per_request, 0)
+
+    def test_writes_and_posts_use_the_default_alias(self):
+        with CaptureQueriesContext(connections['readonly']) as reader:
+            self.client.post(reverse('add_to_cart', args=[self.cake.pk]))
+            with transaction.atomic():
+                Cake.objects.update(featured=True)
+                # Reads inside a transaction see its own writes
+                self.assertEqual(Cake.objects.filter(featured=True).count(), 1)
+        self.assertEqual(reader.captured_queries, [])
+        with self.assertRaises(OperationalError), connections['readonly'].cursor() as cursor:
+            cursor.execute('DELETE FROM rose_cakes_cake')
+
+
+class SQLiteConcurrencyTests(SimpleTestCase):
+    """Many threads doing read-then-write transactions on one SQLite file, as concurrent checkouts do."""
+    threads = 8
+    rounds = 20
+
+    @classmethod
+    def setUpClass(cls):
+        # An alias of its own on a scratch file, added after the test databases are set up
+        connections.settings['concurrency'] = dict(connections.settings['default'])
+        cls.addClassCleanup(connections.settings.pop, 'concurrency')
+        cls.databases = {'concurrency'}
+        super().setUpClass()
+
+    def run_writers(self, options):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        alias = 'concurrency'
+        connections.settings[alias].update(NAME=os.path.join(directory, 'db.sqlite3'), OPTIONS=options)
+        with connections[alias].cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)')
+            cursor.execute('INSERT INTO counter VALUES (1, 0)')
+        connections[alias].close()
+
+        barrier = threading.Barrier(self.threads)
+        errors = []
+
+        def writer():
+            try:
+                for _ in range(self.rounds):
+                    barrier.wait()
+                    try:
+                        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                            cursor.execute('SELECT value FROM counter WHERE id = 1')
+                            value = cursor.fetchone()[0]
+                            cursor.execute('UPDATE counter SET value = %s WHERE id = 1', [value + 1])
+                    except OperationalError as e:
+                        errors.append(str(e))
+            finally:
+                connections[alias].close()
+
+        workers = [threading.Thread(target=writer) for _ in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT value FROM counter WHERE id = 1')
+            value = cursor.fetchone()[0]
+        connections[alias].close()
+        # The next run connects with its own settings
+        del connections[alias]
+        return value, errors
+
+    def test_bare_sqlite_fails_with_locked_errors(self):
+        value, errors = self.run_writers({})
+        self.assertIn('database is locked', errors)
+        self.assertEqual(value, self.threads * self.rounds - len(errors))
+
+    def test_connection_profile_serializes_writers(self):
+        value, errors = self.run_writers(settings.DATABASES['default']['OPTIONS'])
+        self.assertEqual(errors, [])
+        self.assertEqual(value, self.threads * self.rounds)
+
+
+class AsyncEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        cream = Category.objects.create(name='Cream Cakes')
+        self.cakes = [
+            Cake.objects.create(name=f'Rose Cake {i}', description='Rose petals', price=Decimal('100.00'),
+                                category=cream if i % 2 else None)
+            for i in range(5)
+        ]
+
+    async def test_typeahead_requests_wait_together_on_one_thread(self):
+        in_flight = 50
+        waiting, threads = [], set()
+        everyone_waiting = asyncio.Event()
+
+        async def slow_index():
+            # Hold every request open until all of them are in the view at once
+            threads.add(threading.get_ident())
+            waiting.append(None)
+            if len(waiting) == in_flight:
+                everyone_waiting.set()
+            await everyone_waiting.wait()
+            return await aget_suggestion_index()
+
+        url = reverse('search_suggestions')
+        with mock.patch('rose_cakes.views.aget_suggestion_index', slow_index):
+            responses = await asyncio.wait_for(
+                asyncio.gather(*[self.async_client.get(url, {'q': 'rose'}) for _ in range(in_flight)]), timeout=30,
+            )
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertEqual(len(responses[0].json()['suggestions']), 5)
+        self.assertEqual(len(threads), 1)
+
+    async def test_search_results_pages(self):
+        with self.settings(CATALOG_PAGE_SIZE=3):
+            first = (await self.async_client.get(reverse('search_results'))).json()
+            self.assertEqual(first['count'], 5)
+            self.assertEqual(first['html'].count('card-title'), 3)
+            second = (await self.async_client.get(first['next_url'])).json()
+            self.assertIsNone(second['next_url'])
+            self.assertEqual(second['html'].count('card-title'), 2)
+            hits = (await self.async_client.get(reverse('search_results'), {'q': 'rose'})).json()
+            self.assertEqual(hits['count'], 5)
+
+    async def test_add_to_cart(self):
+        url = reverse('add_to_cart', args=[self.cakes[0].pk])
+        for expected in (1, 2):
+            data = (await self.async_client.post(url, headers={'X-Requested-With': 'XMLHttpRequest'})).json()
+            self.assertEqual(data['total_items'], expected)
+            self.assertEqual(data['cart_total'], str(Decimal('100.00') * expected))
+        response = await self.async_client.post(reverse('add_to_cart', args=[self.cakes[1].pk]))
+        self.assertRedirects(response, reverse('cart'), fetch_redirect_response=False)
+        cart = await self.async_client.get(reverse('cart'))
+        self.assertContains(cart, 'Rose Cake 0')
+        self.assertContains(cart, 'Rose Cake 1')
+        self.assertEqual(cart.context['total_items'], 3)
+        self.assertEqual((await self.async_client.post(reverse('add_to_cart', args=[0]))).status_code, 404)
+
+
+class CouponTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        now = timezone.now()
+        self.coupon = Coupon.objects.create(code='ROSE10', discount_percentage=Decimal('10'), usage_limit=2,
+                                            valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1))
+        self.cake = Cake.objects.create(name='Rose Velvet', description='Red', price=Decimal('500.00'))
+
+    def test_lookups_are_cached_until_a_coupon_changes(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(find_coupon(' rose10 '), self.coupon)
+            self.assertIsNone(find_coupon('GUESS'))
+        with self.assertNumQueries(0):
+            self.assertEqual(find_coupon('ROSE10'), self.coupon)
+            self.assertIsNone(find_coupon('GUESS'))
+            self.assertIsNone(find_coupon(''))
+        Coupon.objects.create(code='GUESS', discount_percentage=Decimal('5'),
+                              valid_from=self.coupon.valid_from, valid_until=self.coupon.valid_until)
+        self.coupon.active = False
+        self.coupon.save()
+        self.assertEqual(find_coupon('GUESS').code, 'GUESS')
+        self.assertIsNone(find_coupon('ROSE10'))
+
+    def test_redeem_stops_at_the_usage_limit(self):
+        stale = find_coupon('ROSE10')
+        self.assertTrue(redeem(stale))
+        self.assertTrue(redeem(stale))
+        self.assertFalse(redeem(stale))
+        self.coupon.refresh_from_db()
+        self.assertEqual(self.coupon.used_count, 2)
+        # The failed redemption dropped the stale entry
+        self.assertIsNone(find_coupon('ROSE10'))
+
+    def test_checkout_with_a_used_up_coupon_places_nothing(self):
+        fill_cart(self.client, [self.cake])
+        self.client.post(reverse('apply_coupon'), {'coupon_code': 'rose10'})
+        # Used up elsewhere after the lookup was cached
+        Coupon.objects.filter(pk=self.coupon.pk).update(used_count=2)
+        response = self.client.post(reverse('checkout'), {
+            'name': 'Asha', 'email': 'asha@example.com', 'whatsapp_number': '', 'pickup_date': '2026-01-01',
+            'coupon_code': 'rose10',
+        })
+        self.assertRedirects(response, reverse('checkout'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Coupon.objects.get().used_count, 2)
+
+        Coupon.objects.filter(pk=self.coupon.pk).update(used_count=1)
+        invalidate_coupon('ROSE10')
+        self.client.post(reverse('checkout'), {
+            'name': 'Asha', 'email': 'asha@example.com', 'whatsapp_number': '', 'pickup_date': '2026-01-01',
+            'coupon_code': 'rose10',
+        })
+        order = Order.objects.get()
+        self.assertEqual((order.coupon, order.coupon_discount), (self.coupon, Decimal('50.00')))
+        self.assertEqual(Coupon.objects.get().used_count, 2)
+
+
+class CouponRedemptionStressTests(TransactionTestCase):
+    def test_concurrent_redemptions_never_pass_the_limit(self):
+        now = timezone.now()
+        coupon = Coupon.objects.create(code='FLASH', discount_percentage=Decimal('50'), usage_limit=100,
+                                       valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1))
+        attempts = 400
+        start = threading.Barrier(16)
+
+        def redeem_some(count):
+            start.wait()
+            try:
+                return [redeem(coupon) for _ in range(count)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = [r for batch in pool.map(redeem_some, [attempts // 16] * 16) for r in batch]
+        self.assertEqual(len(results), attempts)
+        self.assertEqual(results.count(True), 100)
+        self.assertEqual(Coupon.objects.get().used_count, 100)
+
+
+class QueryPlanTests(TestCase):
+    """Hot pages must not fall back to full table scans of the big tables."""
+
+    # Full scans; "SCAN x USING [COVERING] INDEX" walks an index in order and stops at the LIMIT
+    FULL_SCAN = re.compile(r'^SCAN (rose_cakes_order|rose_cakes_orderitem|rose_cakes_cake)$')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asha', password='pw', is_staff=True, is_superuser=True)
+        cream = Category.objects.create(name='Cream Cakes')
+        cls.cakes = [
+            Cake.objects.create(name=f'Cake {i}', description='Rich plum', price=Decimal('100.00'),
+                                featured=i % 5 == 0, category=cream if i % 2 else None)
+            for i in range(30)
+        ]
+        now = timezone.now()
+        SpecialOffer.objects.create(title='Five off', description='-', discount_percentage=Decimal('5'),
+                                    valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1))
+        priced = price_cart({cake.id: 1 for cake in cls.cakes[:3]})
+        cls.orders = [
+            place_order(priced, customer_name='Asha', customer_email='asha@example.com', whatsapp_number='',
+                        pickup_date=date(2026, 1, 1), user=cls.user)
+            for _ in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+
+    def assert_no_full_scans(self, url, **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, **extra)
+        self.assertLess(response.status_code, 400, url)
+        scans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                scans += [(row[3], query['sql']) for row in cursor.fetchall() if self.FULL_SCAN.match(row[3])]
+        self.assertEqual(scans, [], url)
+
+    def test_storefront(self):
+        cake = self.cakes[1]
+        get_suggestion_index()  # built once per process, not per request
+        fill_cart(self.client, self.cakes[:3])
+        for url in [
+            reverse('homepage'),
+            reverse('catalog'),
+            reverse('catalog') + f'?category={cake.category_id}',
+            self.client.get(reverse('catalog')).context['next_url'],
+            reverse('cake_detail', args=[cake.id]),
+            reverse('search') + '?q=plum',
+            reverse('search_results') + '?q=cake',
+            reverse('search_suggestions') + '?q=cak',
+            reverse('cart'),
+            reverse('checkout'),
+            reverse('order_confirmation', args=[self.orders[0].id]),
+        ]:
+            self.assert_no_full_scans(url)
+
+    def test_signed_in_pages(self):
+        self.client.force_login(self.user)
+        self.assert_no_full_scans(reverse('order_history'))
+        changelist = reverse('admin:rose_cakes_order_changelist')
+        self.assert_no_full_scans(changelist + '?status__exact=pending')
+        self.assert_no_full_scans(changelist + '?user=asha')
+        self.assert_no_full_scans(reverse('admin:rose_cakes_order_change', args=[self.orders[0].id]))
@@ -0,0 +1,195 @@
+"""Per-request timing: SQL, template rendering and outbound notifications.
+
+``RequestTimingMiddleware`` (on with ``settings.REQUEST_TIMING``) adds a
+``Server-Timing`` header to every response and logs one JSON line to the
+``rose_cakes.slow_requests`` logger for requests slower than
+``settings.SLOW_REQUEST_MS``, naming the view and its slowest statements.
+Queries are counted by a wrapper on every connection (see
+``install_query_timing``), so those the async ORM runs in worker threads are
+included. Template time comes from the ``TimedDjangoTemplates`` backend (see
+``settings.TEMPLATES``) and includes any queries run while rendering.
+"""
+import heapq
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('rose_cakes.slow_requests')
+
+_current = ContextVar('request_timing', default=None)
+
+
+def slow_request_ms() -> float:
+    return getattr(settings, 'SLOW_REQUEST_MS', 500)
+
+
+def slow_sql_count() -> int:
+    return getattr(settings, 'SLOW_REQUEST_SQL_COUNT', 3)
+
+
+@dataclass
+class RequestTiming:
+    queries: int = 0
+    db_ms: float = 0.0
+    template_ms: float = 0.0
+    notify_ms: float = 0.0
+    # Min-heap of (ms, order, sql) holding the slowest statements so far
+    slowest: list = field(default_factory=list)
+    template_depth: int = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.queries += 1
+            self.db_ms += ms
+            entry = (ms, self.queries, sql)
+            if len(self.slowest) < slow_sql_count():
+                heapq.heappush(self.slowest, entry)
+            elif self.slowest and ms > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def slowest_sql(self) -> list:
+        return [{'ms': round(ms, 2), 'sql': sql} for ms, _, sql in sorted(self.slowest, reverse=True)]
+
+    def server_timing(self, total_ms) -> str:
+        return ', '.join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'notify;dur={self.notify_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+
+@contextmanager
+def timed_notifications():
+    """Count the time inside the block as outbound notification time of the current request."""
+    timing = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing.notify_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timing = _current.get()
+        if timing is None:
+            return super().render(context, request)
+        # A tag may render_to_string another template; only the outermost one is counted
+        timing.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.template_depth -= 1
+            if not timing.template_depth:
+                timing.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, adding render time to the current request's timing.
+
+    Only templates rendered through the backend (``render``,
+    ``render_to_string``, ...) are timed; their includes are part of them.
+    Outside a timed request it costs one context variable lookup per render.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_timing(connection, **kwargs):
+    """Count the queries of every connection towards the request running them.
+
+    Connections are per thread and the async ORM queries from worker threads,
+    so the wrapper goes on each connection as it connects and finds the
+    request through ``_current``, which follows it into those threads. Outside
+    a timed request it costs one context variable lookup per query.
+    """
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+class RequestTimingMiddleware:
+    """Time each request and report it in ``Server-Timing`` and the slow-request log."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = _current.set(timing)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing, start)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing, start)
+
+    def finish(self, request, response, timing, start):
+        total_ms = (time.perf_counter() - start) * 1000
+        response['Server-Timing'] = timing.server_timing(total_ms)
+        if total_ms >= slow_request_ms():
+            self.log_slow_request(request, response, timing, total_ms)
+        return response
+
+    def log_slow_request(self, request, response, timing, total_ms):
+        match = request.resolver_match
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'db_ms': round(timing.db_ms, 1),
+            'queries': timing.queries,
+            'template_ms': round(timing.template_ms, 1),
+            'notify_ms': round(timing.notify_ms, 1),
+            'slowest_sql': timing.slowest_sql(),
+        }))
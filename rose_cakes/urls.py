@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.homepage, name='homepage'),
     path('catalog/', views.catalog, name='catalog'),
+    path('catalog/more/', views.catalog_more, name='catalog_more'),
     path('cake/<int:cake_id>/', views.cake_detail, name='cake_detail'),
     path('add-to-cart/<int:cake_id>/', views.add_to_cart, name='add_to_cart'),
     path('buy-now/<int:cake_id>/', views.buy_now, name='buy_now'),
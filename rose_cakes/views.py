@@ -1,4 +1,4 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, aget_object_or_404, get_object_or_404, redirect
 from django.contrib import messages
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
@@ -6,67 +6,92 @@ from django.contrib.auth.forms import UserCreationForm
 from django.core.mail import send_mail
 from django.conf import settings
 from django.db import models
-from django.db.models import Q
 from django.utils import timezone
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
 from .models import Cake, Order, OrderItem, Category, Coupon, SpecialOffer, SiteSettings
-from .notifications import notify_admin_new_order, notify_user_order_status
+from .cart import aprice_cart, price_cart
+from .conditional import shared_conditional, visitor_conditional
+from .coupons import CouponUnavailable, find_coupon
+from .offers import get_offer_schedule
+from .orders import place_order
+from .pagination import card_queryset, keyset_page, newest_first_page
+from .routers import read_only
+from .search import asearch_page, search_page
+from .suggestions import aget_suggestion_index
 from django.urls import reverse
 from django.template.loader import render_to_string
-from difflib import SequenceMatcher
 # import razorpay # Removed Razorpay
 # import stripe    # Uncomment when installing stripe
 
+@read_only
 def homepage(request):
-    featured_cakes = Cake.objects.filter(featured=True)
-    special_offers = SpecialOffer.objects.filter(active=True, valid_from__lte=timezone.now(), valid_until__gte=timezone.now())
-    site_settings = SiteSettings.get_settings()
-    return render(request, 'rose_cakes/homepage.html', {'featured_cakes': featured_cakes, 'special_offers': special_offers, 'site_settings': site_settings})
-
-def catalog(request):
+    featured_cakes = card_queryset(Cake.objects.filter(featured=True))
+    special_offers = get_offer_schedule().offers
+    return render(request, 'rose_cakes/homepage.html', {'featured_cakes': featured_cakes, 'special_offers': special_offers})
+
+def _next_page_url(request, url_name, page):
+    if not page.has_next:
+        return None
+    params = request.GET.copy()
+    params['after'] = page.next_cursor
+    return f"{reverse(url_name)}?{params.urlencode()}"
+
+def _catalog_page(request):
     category_id = request.GET.get('category', '')
 
-    cakes = Cake.objects.all()
+    cakes = card_queryset(Cake.objects.all())
 
     # Filter by category if selected
     if category_id:
         cakes = cakes.filter(category_id=category_id)
 
-    # Sort cakes by category name, then cake name
-    cakes = cakes.order_by('category__name', 'name')
+    # Sorted by category name, then cake name, one page at a time
+    return category_id, keyset_page(cakes, request.GET.get('after'))
+
+@read_only
+@visitor_conditional
+def catalog(request):
+    category_id, page = _catalog_page(request)
 
     categories = Category.objects.all().order_by('name')
 
     return render(request, 'rose_cakes/catalog.html', {
-        'cakes': cakes,
+        'cakes': page.items,
+        'next_url': _next_page_url(request, 'catalog_more', page),
         'categories': categories,
         'selected_category': category_id
     })
 
+@read_only
+@visitor_conditional
+def catalog_more(request):
+    """Next page of catalog cards for infinite scroll."""
+    _, page = _catalog_page(request)
+    html = render_to_string('rose_cakes/partials/catalog_cards.html', {'cakes': page.items}, request=request)
+    return JsonResponse({'html': html, 'next_url': _next_page_url(request, 'catalog_more', page)})
+
+@read_only
+@visitor_conditional
 def cake_detail(request, cake_id):
     cake = get_object_or_404(Cake, id=cake_id)
     return render(request, 'rose_cakes/cake_detail.html', {'cake': cake})
 
-def add_to_cart(request, cake_id):
-    cake = get_object_or_404(Cake, id=cake_id)
-    cart = request.session.get('cart', {})
-
-    if str(cake_id) in cart:
-        cart[str(cake_id)] += 1
-    else:
-        cart[str(cake_id)] = 1
+async def add_to_cart(request, cake_id):
+    cake = await aget_object_or_404(Cake.objects.only('id', 'name'), id=cake_id)
+    await request.cart.aitems()
+    request.cart.add(cake.id)
 
-    request.session['cart'] = cart
-    
     # If AJAX request, return JSON
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        total_items = sum(cart.values())
+        priced = await aprice_cart(request.cart.items)
+        request.cart.discard(priced.stale_keys)
         return JsonResponse({
             'success': True,
             'message': f'{cake.name} added to cart!',
-            'total_items': total_items
+            'total_items': priced.total_items,
+            'cart_total': str(priced.total)
         })
     
     messages.success(request, f'{cake.name} added to cart!')
@@ -75,84 +100,44 @@ def add_to_cart(request, cake_id):
 def buy_now(request, cake_id):
     cake = get_object_or_404(Cake, id=cake_id)
     # Clear cart and add only this item
-    request.session['cart'] = {str(cake_id): 1}
+    request.cart.replace({cake.id: 1})
     messages.success(request, f'{cake.name} added to cart. Proceeding to checkout...')
     return redirect('checkout')
 
 def remove_from_cart(request, cake_id):
-    cart = request.session.get('cart', {})
     cake = get_object_or_404(Cake, id=cake_id)
-
-    if str(cake_id) in cart:
-        if cart[str(cake_id)] > 1:
-            cart[str(cake_id)] -= 1
-        else:
-            del cart[str(cake_id)]
-
-    request.session['cart'] = cart
+    request.cart.remove_one(cake.id)
     messages.success(request, f'{cake.name} removed from cart!')
     return redirect('cart')
 
+@read_only
 def cart(request):
-    cart = request.session.get('cart', {})
-    cart_items = []
-    total = 0
-    total_items = 0
-
-    for cake_id, quantity in cart.items():
-        cake = get_object_or_404(Cake, id=cake_id)
-        subtotal = cake.price * quantity
-        total += subtotal
-        total_items += quantity
-        cart_items.append({
-            'cake': cake,
-            'quantity': quantity,
-            'subtotal': subtotal,
-            'total_price': subtotal  # Added for template compatibility
-        })
+    priced = price_cart(request.cart.items)
+    request.cart.discard(priced.stale_keys)
+    cart_items = list(priced.lines)
 
     return render(request, 'rose_cakes/cart.html', {
         'cart': cart_items,  # Changed to 'cart' for template compatibility
         'cart_items': cart_items,
-        'total': total,
-        'total_items': total_items,
-        'total_price': total,  # Added for template compatibility
-        'final_total': total
+        'total': priced.total,
+        'total_items': priced.total_items,
+        'total_price': priced.total,  # Added for template compatibility
+        'final_total': priced.total
     })
 
 def checkout(request):
-    cart = request.session.get('cart', {})
-    cart_items = []
-    total = 0
-
-    for cake_id, quantity in cart.items():
-        cake = get_object_or_404(Cake, id=cake_id)
-        subtotal = cake.price * quantity
-        total += subtotal
-        cart_items.append({
-            'cake': cake,
-            'quantity': quantity,
-            'subtotal': subtotal
-        })
-
-    final_total = total
+    priced = price_cart(request.cart.items)
+    request.cart.discard(priced.stale_keys)
+    cart_items = list(priced.lines)
+    total = priced.total
 
     # Check for special offers
-    special_offer_discount = 0
-    applied_offer = None
-    if total > 0:  # Apply offers if cart has items
-        active_offers = SpecialOffer.objects.filter(active=True, valid_from__lte=timezone.now(), valid_until__gte=timezone.now())
-        for offer in active_offers:
-            if total >= offer.minimum_order_value:
-                discount = offer.get_discount_amount(total)
-                if discount > special_offer_discount:
-                    special_offer_discount = discount
-                    applied_offer = offer
+    applied_offer, special_offer_discount = get_offer_schedule().best_offer(total)
 
     final_total = total - special_offer_discount
 
     if request.method == 'POST':
-        if not cart:
+        if not priced:
             messages.error(request, 'Your cart is empty!')
             return redirect('cart')
 
@@ -172,55 +157,32 @@ def checkout(request):
         discount = 0
         coupon = None
         if coupon_code:
-            try:
-                coupon = Coupon.objects.get(
-                    code=coupon_code.upper(),
-                    active=True,
-                    valid_from__lte=timezone.now(),
-                    valid_until__gte=timezone.now(),
-                    used_count__lt=models.F('usage_limit')
-                )
-                discount = total * (coupon.discount_percentage / 100)
-                coupon.used_count += 1
-                coupon.save()
-            except Coupon.DoesNotExist:
+            coupon = find_coupon(coupon_code)
+            if coupon is None:
                 messages.error(request, 'Invalid or expired coupon code!')
                 return redirect('checkout')
+            discount = total * (coupon.discount_percentage / 100)
 
-        final_total = total - discount - special_offer_discount
-
-        order = Order.objects.create(
-            customer_name=customer_name,
-            customer_email=customer_email,
-            whatsapp_number=whatsapp_number,
-            pickup_date=pickup_date,
-            total_amount=final_total,
-            user=request.user if request.user.is_authenticated else None,
-            coupon=coupon,
-            special_offer=applied_offer,
-            discount_amount=discount + special_offer_discount,
-            status='pending' # Await admin acceptance
-        )
-
-        for cake_id, quantity in cart.items():
-            cake = get_object_or_404(Cake, id=cake_id)
-            price = cake.price
-
-            OrderItem.objects.create(
-                order=order,
-                cake=cake,
-                quantity=quantity,
-                price=price
-            )
-
-        # Notify admin of new order
+        # Order, items and the coupon redemption are written in one transaction
         try:
-            notify_admin_new_order(order)
-        except Exception:
-            pass
+            order = place_order(
+                priced,
+                customer_name=customer_name,
+                customer_email=customer_email,
+                whatsapp_number=whatsapp_number,
+                pickup_date=pickup_date,
+                user=request.user if request.user.is_authenticated else None,
+                coupon=coupon,
+                special_offer=applied_offer,
+                discount_amount=discount + special_offer_discount,
+                coupon_discount=discount,
+            )
+        except CouponUnavailable:
+            messages.error(request, 'Invalid or expired coupon code!')
+            return redirect('checkout')
 
         # Clear cart
-        request.session['cart'] = {}
+        request.cart.clear()
 
         return redirect('order_confirmation', order_id=order.id)
 
@@ -232,19 +194,26 @@ def checkout(request):
         'applied_offer': applied_offer
     })
 
+@read_only
 def order_confirmation(request, order_id):
+    # Lines come from the order's snapshot, as they were when it was placed
     order = get_object_or_404(Order, id=order_id)
-
-    # Add subtotal to each order item for template display
-    for item in order.items.all():
-        item.subtotal = item.price * item.quantity
-
     return render(request, 'rose_cakes/order_confirmation.html', {'order': order})
 
+@read_only
 @login_required
 def order_history(request):
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'rose_cakes/order_history.html', {'orders': orders})
+    # Rows render from the order's own summary columns; no item or cake joins
+    orders = Order.objects.filter(user=request.user).only(
+        'id', 'created_at', 'status', 'total_amount', 'item_count', 'items_total', 'line_snapshot',
+    )
+    # Newest first, one page at a time; later pages are appended as table rows
+    page = newest_first_page(orders, request.GET.get('after'))
+    next_url = _next_page_url(request, 'order_history', page)
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        html = render_to_string('rose_cakes/partials/order_rows.html', {'orders': page.items}, request=request)
+        return JsonResponse({'html': html, 'next_url': next_url})
+    return render(request, 'rose_cakes/order_history.html', {'orders': page.items, 'next_url': next_url})
 
 def register(request):
     if request.method == 'POST':
@@ -274,104 +243,79 @@ def user_logout(request):
     logout(request)
     return redirect('homepage')
 
+@read_only
 def search(request):
     query = request.GET.get('q', '')
     category_id = request.GET.get('category', '')
 
-    cakes = Cake.objects.all()
-
-    if query:
-        cakes = cakes.filter(
-            Q(name__icontains=query) |
-            Q(description__icontains=query)
-        )
-
-    if category_id:
-        cakes = cakes.filter(category_id=category_id)
+    page, total = search_page(query, category_id, request.GET.get('after'))
 
     categories = Category.objects.all()
 
     return render(request, 'rose_cakes/search.html', {
-        'cakes': cakes,
+        'cakes': page.items,
+        'total': total,
+        'next_url': _next_page_url(request, 'search_results', page),
         'query': query,
         'categories': categories,
         'selected_category': category_id
     })
 
-def search_suggestions(request):
+@read_only
+@shared_conditional
+async def search_suggestions(request):
     q = request.GET.get('q', '').strip()
     category_id = request.GET.get('category') or ''
     suggestions = []
     if q:
-        base_qs = Cake.objects.all()
-        if category_id:
-            base_qs = base_qs.filter(category_id=category_id)
-        exact_first = list(base_qs.filter(name__istartswith=q)[:5])
-        contains_next = list(base_qs.filter(name__icontains=q).exclude(id__in=[c.id for c in exact_first])[:5])
-        by_category = list(base_qs.filter(category__name__icontains=q).exclude(id__in=[c.id for c in exact_first + contains_next])[:5])
-        combined = exact_first + contains_next + by_category
-
-        if not combined:
-            # Fuzzy fallback using simple similarity
-            names = list(base_qs.values('id', 'name'))
-            scored = []
-            for item in names:
-                ratio = SequenceMatcher(None, q.lower(), item['name'].lower()).ratio()
-                if ratio >= 0.5:
-                    scored.append((ratio, item['id'], item['name']))
-            scored.sort(reverse=True)
-            for _, cid, cname in scored[:5]:
-                suggestions.append({
-                    'id': cid,
-                    'name': cname,
-                    'detail_url': reverse('cake_detail', args=[cid])
-                })
-        else:
-            for cake in combined[:5]:
-                suggestions.append({
-                    'id': cake.id,
-                    'name': cake.name,
-                    'detail_url': reverse('cake_detail', args=[cake.id])
-                })
+        # Exact, prefix, substring, category and typo-tolerant matches from
+        # the in-memory index; no database queries per keystroke
+        index = await aget_suggestion_index()
+        for cid, cname, kind in index.lookup(q, category_id, limit=5):
+            suggestions.append({
+                'id': cid,
+                'name': cname,
+                'match': kind,
+                'detail_url': reverse('cake_detail', args=[cid])
+            })
 
     return JsonResponse({'suggestions': suggestions})
 
-def search_results(request):
+@read_only
+@shared_conditional
+async def search_results(request):
     q = request.GET.get('q', '').strip()
     category_id = request.GET.get('category') or ''
-    cakes = Cake.objects.all()
-    if category_id:
-        cakes = cakes.filter(category_id=category_id)
-    if q:
-        cakes = cakes.filter(
-            Q(name__icontains=q) | Q(description__icontains=q) | Q(category__name__icontains=q)
-        )
-    cakes = cakes.order_by('name')
+    cursor = request.GET.get('after')
+    # Later pages only append cards, so they skip counting the matches again
+    page, total = await asearch_page(q, category_id, cursor, with_total=not cursor)
+    next_url = _next_page_url(request, 'search_results', page)
+
+    if cursor:
+        html = render_to_string('rose_cakes/partials/search_cards.html', {'cakes': page.items}, request=request)
+        return JsonResponse({'html': html, 'next_url': next_url})
 
     html = render_to_string('rose_cakes/partials/search_results.html', {
-        'cakes': cakes,
+        'cakes': page.items,
+        'total': total,
+        'next_url': next_url,
     }, request=request)
-    return JsonResponse({'html': html, 'count': cakes.count()})
+    return JsonResponse({'html': html, 'count': total, 'next_url': next_url})
 
 def apply_coupon(request):
     if request.method == 'POST':
-        coupon_code = request.POST.get('coupon_code')
-        try:
-            coupon = Coupon.objects.get(
-                code=coupon_code.upper(),
-                active=True,
-                valid_from__lte=timezone.now(),
-                valid_until__gte=timezone.now(),
-                used_count__lt=models.F('usage_limit')
-            )
+        coupon = find_coupon(request.POST.get('coupon_code'))
+        if coupon is not None:
             request.session['coupon_code'] = coupon.code
             messages.success(request, f'Coupon {coupon.code} applied! {coupon.discount_percentage}% discount.')
-        except Coupon.DoesNotExist:
+        else:
             messages.error(request, 'Invalid or expired coupon code!')
     return redirect('cart')
 
+@read_only
 def privacy_policy(request):
     return render(request, 'rose_cakes/privacy_policy.html')
 
+@read_only
 def terms_conditions(request):
     return render(request, 'rose_cakes/terms_conditions.html')
@@ -1,3 +1,60 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from rose_cakes.caching import get_site_settings, invalidate_site_settings
+from rose_cakes.cart import price_cart
+from rose_cakes.models import Cake, SiteSettings
+from rose_cakes.orders import place_order
+
+
+class StoreSettingsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.user = User.objects.create_user('staff', password='pass12345', is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_customers_cannot_change_settings(self):
+        self.client.force_login(User.objects.create_user('customer', password='pass12345'))
+        response = self.client.post(reverse('store_admin_app:store_settings'), {'store_email': 'me@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response['Location'])
+        self.assertFalse(SiteSettings.objects.exists())
+
+    def test_saving_store_settings_refreshes_cached_copy(self):
+        self.client.get(reverse('store_admin_app:store_settings'))
+        self.assertIsNone(get_site_settings().whatsapp_number)
+        self.client.post(reverse('store_admin_app:store_settings'), {'whatsapp_number': '+919999999999'})
+        self.assertEqual(get_site_settings().whatsapp_number, '+919999999999')
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        invalidate_site_settings()
+        self.user = User.objects.create_user('staff', password='pass12345', is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_customers_cannot_see_sales(self):
+        self.client.force_login(User.objects.create_user('customer', password='pass12345'))
+        response = self.client.get(reverse('store_admin_app:dashboard'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response['Location'])
 
-# Create your tests here.
+    def test_dashboard_renders_from_rollups(self):
+        cake = Cake.objects.create(name='Plum Cake', description='-', price=Decimal('450.00'))
+        for _ in range(2):
+            place_order(price_cart({cake.id: 2}), customer_name='Asha', customer_email='asha@example.com',
+                        whatsapp_number='', pickup_date=date(2026, 1, 1))
+        self.client.get(reverse('store_admin_app:dashboard'))
+        # session, user, daily sales, top cakes
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('store_admin_app:dashboard'))
+        # the three periods, today's bar and the top cake
+        self.assertContains(response, '₹1800.00', count=5)
+        self.assertContains(response, 'Plum Cake: 4 sold')
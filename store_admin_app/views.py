@@ -1,24 +1,29 @@
 from django.shortcuts import render, redirect
-from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from rose_cakes.models import SiteSettings
+from rose_cakes.rollups import sales_summary
 
-@login_required
+# Store-wide sales figures: staff only
+@staff_member_required
 def dashboard(request):
-    return render(request, 'store_admin_app/dashboard.html')
+    # Figures come from the daily rollups, never from the orders themselves
+    return render(request, 'store_admin_app/dashboard.html', {'sales': sales_summary()})
 
-@login_required
+# Sets where new-order alerts (with customer details) are sent: staff only
+@staff_member_required
 def store_settings(request):
     settings_obj, created = SiteSettings.objects.get_or_create(pk=1)
     if request.method == 'POST':
-        settings_obj.store_name = request.POST.get('store_name', settings_obj.store_name)
-        settings_obj.store_address = request.POST.get('store_address', settings_obj.store_address)
-        settings_obj.store_phone = request.POST.get('store_phone', settings_obj.store_phone)
-        settings_obj.store_email = request.POST.get('store_email', settings_obj.store_email)
+        settings_obj.site_name = request.POST.get('store_name', settings_obj.site_name)
+        settings_obj.address = request.POST.get('store_address', settings_obj.address)
+        settings_obj.phone = request.POST.get('store_phone', settings_obj.phone)
+        settings_obj.email = request.POST.get('store_email', settings_obj.email)
         settings_obj.store_description = request.POST.get('store_description', settings_obj.store_description)
         settings_obj.facebook_url = request.POST.get('facebook_url', settings_obj.facebook_url)
         settings_obj.instagram_url = request.POST.get('instagram_url', settings_obj.instagram_url)
         settings_obj.whatsapp_number = request.POST.get('whatsapp_number', settings_obj.whatsapp_number)
+        # post_save drops the cached copy served by rose_cakes.caching
         settings_obj.save()
         messages.success(request, 'Store settings updated successfully!')
         return redirect('store_admin_app:store_settings')